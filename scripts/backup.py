@@ -15,6 +15,7 @@ from typing import Any, Optional, TypeAlias, Type
 
 import boto3
 from pathlib import Path
+from requests.adapters import HTTPAdapter, Retry
 import gooddata_api_client
 from gooddata_sdk import __version__ as sdk_version
 from gooddata_sdk import GoodDataSdk
@@ -28,6 +29,7 @@ TIMESTAMP_SDK_FOLDER = (
 
 API_VERSION = "v1"
 BEARER_TKN_PREFIX = "Bearer"
+CSV_READ_BUFFER_SIZE = 1024 * 1024
 PROFILES_FILE = "profiles.yaml"
 PROFILES_DIRECTORY = ".gooddata"
 PROFILES_FILE_PATH = Path.home() / PROFILES_DIRECTORY / PROFILES_FILE
@@ -43,6 +45,11 @@ logger.addHandler(ch)
 LAYOUTS_DIR = "gooddata_layouts"
 LDM_DIR = "ldm"
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # libyaml bindings are not available
+    from yaml import SafeDumper
+
 
 class GoodDataRestApiError(Exception):
     """Wrapper for errors occurring from interaction with GD REST API."""
@@ -123,11 +130,50 @@ MaybeResponse: TypeAlias = Optional[requests.Response]
 class GDApi:
     """Wrapper for GoodData REST API client."""
 
-    def __init__(self, host: str, api_token: str, headers=None):
+    def __init__(
+        self, host: str, api_token: str, headers: Optional[dict[str, Any]] = None
+    ):
+        # TODO - Currently no credentials validation
+        # TODO - do we also support username+pwd auth? Or do we enforce token only?
+        if not api_token:
+            raise RuntimeError(
+                "Token required for authentication against GD API is missing."
+            )
         self.endpoint = self._handle_endpoint(host)
         self.api_token = api_token
         self.headers = headers if headers else {}
         self.wait_api_time = 10
+        self._session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        """
+        Creates HTTP session reusing keep-alive connections to the GoodData API
+        and retrying requests which failed on transient gateway errors.
+        """
+        session = requests.Session()
+        # The last response is returned once retries are exhausted,
+        # so that its status is handled by _resolve_return_code.
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retries)
+        session.mount("https://", adapter)
+        session.headers.update(self.headers)
+        session.headers["Authorization"] = f"{BEARER_TKN_PREFIX} {self.api_token}"
+        return session
+
+    def close(self) -> None:
+        """Closes the connections held by the underlying HTTP session."""
+        self._session.close()
+
+    def __enter__(self) -> "GDApi":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     @staticmethod
     def _handle_endpoint(host: str) -> str:
@@ -146,43 +192,24 @@ class GDApi:
         not_found_code: int = 404,
     ) -> MaybeResponse:
         """Sends a GET request to the GoodData API."""
-        kwargs = self._prepare_request(path, params)
-        logger.debug(f"GET request: {json.dumps(kwargs)}")
-        response = requests.get(**kwargs)
+        url = f"{self.endpoint}/{path}"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("GET request: %s", json.dumps({"url": url, "params": params}))
+        response = self._session.get(url, params=params, timeout=self.wait_api_time)
         return self._resolve_return_code(
-            response, ok_code, kwargs["url"], "RestApi.get", not_found_code
+            response, ok_code, url, "RestApi.get", not_found_code
         )
 
-    def _prepare_request(self, path: str, params=None) -> dict[str, Any]:
-        """Prepares the request to be sent to the GoodData API."""
-        kwargs: dict[str, Any] = {
-            "url": f"{self.endpoint}/{path}",
-            "headers": self.headers.copy(),
-        }
-        if params:
-            kwargs["params"] = params
-        if self.api_token:
-            kwargs["headers"]["Authorization"] = f"{BEARER_TKN_PREFIX} {self.api_token}"
-        else:
-            raise RuntimeError(
-                "Token required for authentication against GD API is missing."
-            )
-        # TODO - Currently no credentials validation
-        # TODO - do we also support username+pwd auth? Or do we enforce token only?
-        # else:
-        #     kwargs['auth'] = (self.user, self.password) if self.user is not None else None  # noqa
-        return kwargs
-
     @staticmethod
     def _resolve_return_code(
         response, ok_code: int, url, method, not_found_code: Optional[int] = None
     ) -> MaybeResponse:
         """Resolves the return code of the response."""
         if response.status_code == ok_code:
-            logger.debug(f"{method} to {url} succeeded")
+            logger.debug("%s to %s succeeded", method, url)
             return response
         if not_found_code and response.status_code == not_found_code:
-            logger.debug(f"{method} to {url} failed - target not found")
+            logger.debug("%s to %s failed - target not found", method, url)
             return None
         raise GoodDataRestApiError(
             f"{method} to {url} failed - "
@@ -234,7 +261,7 @@ def create_parser() -> argparse.ArgumentParser:
 def write_to_yaml(folder, source):
     """Writes the source to a YAML file."""
     with open(folder, "w") as outfile:
-        yaml.dump(source, outfile)
+        yaml.dump(source, outfile, Dumper=SafeDumper)
 
 
 def get_storage(storage_type: str) -> Type[BackupStorage]:
@@ -265,27 +292,18 @@ def store_user_data_filters(
     user_data_filters: dict, export_path: Path, org_id: str, ws_id: str
 ):
     """Stores the user data filters in the specified export path."""
-    os.mkdir(
-        os.path.join(
-            export_path,
-            "gooddata_layouts",
-            org_id,
-            "workspaces",
-            ws_id,
-            "user_data_filters",
-        )
+    udf_dir = os.path.join(
+        export_path,
+        "gooddata_layouts",
+        org_id,
+        "workspaces",
+        ws_id,
+        "user_data_filters",
     )
+    os.mkdir(udf_dir)
 
     for filter in user_data_filters["userDataFilters"]:
-        udf_file_path = os.path.join(
-            export_path,
-            "gooddata_layouts",
-            org_id,
-            "workspaces",
-            ws_id,
-            "user_data_filters",
-            filter["id"] + ".yaml",
-        )
+        udf_file_path = os.path.join(udf_dir, filter["id"] + ".yaml")
         write_to_yaml(udf_file_path, filter)
 
 
@@ -300,7 +318,9 @@ def get_workspace_export(
     Iterate over all workspaces in the input ws_csv and store their
         declarative_workspace and their respective user data filters.
     """
-    with open(args.ws_csv) as csvfile:
+    with open(
+        args.ws_csv, encoding="utf-8", newline="", buffering=CSV_READ_BUFFER_SIZE
+    ) as csvfile:
         workspace_list = csv.reader(csvfile, skipinitialspace=True)
         next(workspace_list, None)
         exported = False
@@ -389,7 +409,7 @@ def main(args):
 
     storage = get_storage(conf.storage_type)(conf)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
+    with api, tempfile.TemporaryDirectory() as tmpdir:
         get_workspace_export(sdk, api, conf.storage_type, tmpdir, org_id)
 
         archive_gooddata_layouts_to_zip(Path(tmpdir, org_id))
@@ -1,12 +1,15 @@
 # (C) 2023 GoodData Corporation
 import argparse
 import csv
+import functools
 import logging
 import os
 import sys
 from dataclasses import dataclass
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Iterator, Optional, TypeAlias
+from typing import Any, Iterable, Iterator, Optional, TypeAlias
 
 import gooddata_sdk as gd_sdk
 from gooddata_api_client.exceptions import NotFoundException
@@ -14,6 +17,10 @@ from gooddata_api_client.exceptions import NotFoundException
 
 USER_TYPE = "user"
 USER_GROUP_TYPE = "userGroup"
+CSV_READ_BUFFER_SIZE = 1024 * 1024
+
+# Common spellings of "true", checked before falling back to lower().
+TRUE_VALUES = frozenset(("true", "True", "TRUE"))
 
 PROFILES_FILE = "profiles.yaml"
 PROFILES_DIRECTORY = ".gooddata"
@@ -64,10 +71,19 @@ def create_parser() -> argparse.ArgumentParser:
     return parser
 
 
-TargetsPermissionDict: TypeAlias = dict[str, dict[str, bool]]
+@functools.lru_cache(maxsize=None)
+def get_assignee(id: str, type: str) -> gd_sdk.CatalogAssigneeIdentifier:
+    """
+    Returns assignee identifier for the given user/userGroup.
+    Identifiers are shared across workspaces, so they are constructed only once.
+    """
+    return gd_sdk.CatalogAssigneeIdentifier(id=id, type=type)
+
+
+TargetsPermissionDict: TypeAlias = dict[str, set[str]]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WSPermission:
     permission: str
     ws_id: str
@@ -88,7 +104,7 @@ class WSPermission:
             ws_id=ws_id,
             id=id,
             type=target_type,
-            is_active=str(is_active).lower() == "true",
+            is_active=is_active in TRUE_VALUES or str(is_active).lower() == "true",
         )
 
 
@@ -111,12 +127,7 @@ class WSPermissionDeclaration:
         for permission in declaration.permissions:
             permission_type, id = permission.assignee.type, permission.assignee.id
             target_dict = users if permission_type == USER_TYPE else user_groups
-
-            id_permissions = target_dict.get(id)
-            if not id_permissions:
-                target_dict[id] = dict()
-
-            target_dict[id][permission.name] = True
+            target_dict.setdefault(id, set()).add(permission.name)
 
         return WSPermissionDeclaration(users, user_groups)
 
@@ -132,17 +143,19 @@ class WSPermissionDeclaration:
         except Exception as e:
             logger.error(
                 "Failed to construct SDK declaration "
-                f'for type={assignee.type} id={assignee.id}. Error: "{e}".'
+                'for type=%s id=%s. Error: "%s".',
+                assignee.type,
+                assignee.id,
+                e,
             )
         return None
 
     def _permissions_for_target(
-        self, permissions: dict[str, bool], assignee: gd_sdk.CatalogAssigneeIdentifier
+        self, permissions: set[str], assignee: gd_sdk.CatalogAssigneeIdentifier
     ) -> Iterator[gd_sdk.CatalogDeclarativeSingleWorkspacePermission]:
         """Constructs permission declarations for a single target."""
-        for permission, is_active in permissions.items():
-            if not is_active:
-                continue
+        # Sorted to keep the resulting declaration deterministic.
+        for permission in sorted(permissions):
             declaration = self._construct_upstream_permission(permission, assignee)
             if not declaration:
                 continue
@@ -158,60 +171,63 @@ class WSPermissionDeclaration:
         ] = []
 
         for user_id, permissions in self.users.items():
-            assignee = gd_sdk.CatalogAssigneeIdentifier(id=user_id, type=USER_TYPE)
-            for declaration in self._permissions_for_target(permissions, assignee):
-                permission_declarations.append(declaration)
+            assignee = get_assignee(user_id, USER_TYPE)
+            permission_declarations.extend(
+                self._permissions_for_target(permissions, assignee)
+            )
 
         for ug_id, permissions in self.user_groups.items():
-            assignee = gd_sdk.CatalogAssigneeIdentifier(id=ug_id, type=USER_GROUP_TYPE)
-            for declaration in self._permissions_for_target(permissions, assignee):
-                permission_declarations.append(declaration)
+            assignee = get_assignee(ug_id, USER_GROUP_TYPE)
+            permission_declarations.extend(
+                self._permissions_for_target(permissions, assignee)
+            )
 
         return gd_sdk.CatalogDeclarativeWorkspacePermissions(
             permissions=permission_declarations
         )
 
-    def add_permission(self, permission: WSPermission):
+    @staticmethod
+    def _resolve_active_permissions(permissions: Iterable[WSPermission]) -> set[str]:
         """
-        Adds WSPermission object into respective field within the instance.
-        Handles duplicate permissions and different combinations of input
-        and upstream is_active permission states.
+        Resolves active permissions of a single target from its input permissions
+        sorted by permission name. Of conflicting duplicates, isActive=True wins.
         """
-        target_dict = self.users if permission.type == USER_TYPE else self.user_groups
-
-        if permission.id not in target_dict:
-            target_dict[permission.id] = {}
-
-        is_active = permission.is_active
-        target_permissions = target_dict[permission.id]
-        permission_value = permission.permission
-
-        if permission_value not in target_permissions:
-            target_permissions[permission_value] = is_active
-        elif not is_active and target_permissions[permission_value] is True:
-            logger.warning(
-                "isActive=False provided after True has been specificed "
-                f'for the same input. Skipping "{permission}".'
-            )
-        elif is_active and target_permissions[permission_value] is False:
-            logger.warning(
-                "isActive=True provided after False has been specified "
-                f'for the same input. Overwriting "{permission}".'
-            )
-            target_permissions[permission_value] = is_active
-
-    def upsert(self, other: "WSPermissionDeclaration"):
+        active_permissions: set[str] = set()
+        for permission_value, duplicates in groupby(
+            permissions, key=attrgetter("permission")
+        ):
+            first, *rest = duplicates
+            is_active = first.is_active
+            for permission in rest:
+                if is_active and not permission.is_active:
+                    logger.warning(
+                        "isActive=False provided after True has been specified "
+                        'for the same input. Skipping "%s".',
+                        permission,
+                    )
+                elif not is_active and permission.is_active:
+                    logger.warning(
+                        "isActive=True provided after False has been specified "
+                        'for the same input. Overwriting "%s".',
+                        permission,
+                    )
+                    is_active = True
+            if is_active:
+                active_permissions.add(permission_value)
+        return active_permissions
+
+    def upsert_permissions(self, permissions: Iterable[WSPermission]):
         """
-        Modifies the owner object by merging with the other.
-        Keeps the unmodified users/userGroups untouched.
-        If some user/userGroup is modified, it gets overwritten with permissions
-        defined in the input.
+        Modifies the owner object by input permissions of a single workspace
+        sorted by (type, id, permission). Keeps the unmodified users/userGroups
+        untouched. Every user/userGroup present in the input gets overwritten
+        with its input permissions.
         """
-        for user_id, permissions in other.users.items():
-            self.users[user_id] = permissions
-
-        for ug_id, permissions in other.user_groups.items():
-            self.user_groups[ug_id] = permissions
+        for (target_type, id), target_permissions in groupby(
+            permissions, key=attrgetter("type", "id")
+        ):
+            target_dict = self.users if target_type == USER_TYPE else self.user_groups
+            target_dict[id] = self._resolve_active_permissions(target_permissions)
 
 
 WSPermissionsDeclarations: TypeAlias = dict[str, WSPermissionDeclaration]
@@ -225,26 +241,6 @@ class WSPermissionManager:
     def __init__(self, sdk: gd_sdk.GoodDataSdk):
         self._sdk = sdk
 
-    def _get_ws_declaration(self, ws_id: str) -> WSPermissionDeclaration:
-        users: TargetsPermissionDict = {}
-        user_groups: TargetsPermissionDict = {}
-
-        upstream_declaration = self._sdk.catalog_permission.get_declarative_permissions(
-            ws_id
-        )
-
-        for permission in upstream_declaration.permissions:
-            permission_type, id = permission.assignee.type, permission.assignee.id
-            target_dict = users if permission_type == USER_TYPE else user_groups
-
-            id_permissions = target_dict.get(id)
-            if not id_permissions:
-                target_dict[id] = dict()
-
-            target_dict[id][permission.name] = True
-
-        return WSPermissionDeclaration(users, user_groups)
-
     def _get_upstream_declaration(
         self, ws_id: str
     ) -> Optional[WSPermissionDeclaration]:
@@ -274,21 +270,6 @@ class WSPermissionManager:
                 ws_dict[ws_id] = declaration
         return ws_dict
 
-    @staticmethod
-    def _construct_declarations(
-        permissions: list[WSPermission],
-    ) -> WSPermissionsDeclarations:
-        """Constructs workspace permission declarations from the input permissions."""
-        ws_dict: WSPermissionsDeclarations = {}
-        for permission in permissions:
-            ws_id = permission.ws_id
-
-            if ws_id not in ws_dict:
-                ws_dict[ws_id] = WSPermissionDeclaration({}, {})
-
-            ws_dict[ws_id].add_permission(permission)
-        return ws_dict
-
     def _check_user_exists(self, user_id: str):
         """Checks if user with provided ID exists."""
         try:
@@ -320,7 +301,9 @@ class WSPermissionManager:
                 self._validate_permission(permission)
             except InvalidPermissionException as e:
                 logger.error(
-                    f'Invalid permission defined. Skipping "{permission}. Error: "{e}".'
+                    'Invalid permission defined. Skipping "%s". Error: "%s".',
+                    permission,
+                    e,
                 )
                 continue
             valid_permissions.append(permission)
@@ -335,16 +318,21 @@ class WSPermissionManager:
         )
         valid_permissions = self._filter_invalid_permissions(permissions)
 
-        input_declarations = self._construct_declarations(valid_permissions)
+        # Sorting makes each workspace and each of its targets a contiguous run.
+        sorted_permissions = sorted(
+            valid_permissions, key=attrgetter("ws_id", "type", "id", "permission")
+        )
 
-        input_ws_ids = list(input_declarations.keys())
+        input_ws_ids = sorted({p.ws_id for p in sorted_permissions})
         upstream_declarations = self._get_upstream_declarations(input_ws_ids)
 
-        for ws_id, declaration in input_declarations.items():
+        for ws_id, ws_input_permissions in groupby(
+            sorted_permissions, key=attrgetter("ws_id")
+        ):
             if ws_id not in upstream_declarations:
                 continue
 
-            upstream_declarations[ws_id].upsert(declaration)
+            upstream_declarations[ws_id].upsert_permissions(ws_input_permissions)
 
             ws_permissions = upstream_declarations[ws_id].to_sdk_api()
 
@@ -369,37 +357,43 @@ def csv_row_is_valid(row: list[Any]) -> bool:
         logger.error(
             "Unable to parse csv row. "
             "Most probably an incorrect amount of values was defined. "
-            f'Skipping following row: "{row}". Error: "{e}".'
+            'Skipping following row: "%s". Error: "%s".',
+            row,
+            e,
         )
         return False
 
     if user_id and user_group_id:
         logger.error(
             "UserID and UserGroupID are mutually exclusive per csv row. "
-            f'Skipping following row: "{row}".'
+            'Skipping following row: "%s".',
+            row,
         )
         return False
 
     if not user_id and not user_group_id:
         logger.error(
             "Either UserID or UserGroupID have to be defined per csv row. "
-            f'Skipping following row: "{row}".'
+            'Skipping following row: "%s".',
+            row,
         )
         return False
 
     if not ws_id:
-        logger.error(f'ws_id field seems to be empty. Skipping following row: "{row}".')
+        logger.error(
+            'ws_id field seems to be empty. Skipping following row: "%s".', row
+        )
         return False
 
     if not permission:
         logger.error(
-            f'permission field seems to be empty. Skipping following row: "{row}".'
+            'permission field seems to be empty. Skipping following row: "%s".', row
         )
         return False
 
     if not is_active:
         logger.error(
-            f'is_active field seems to be empty. Skipping following row: "{row}".'
+            'is_active field seems to be empty. Skipping following row: "%s".', row
         )
         return False
 
@@ -409,7 +403,13 @@ def csv_row_is_valid(row: list[Any]) -> bool:
 def read_permissions_from_csv(csv_path: str) -> list[WSPermission]:
     """Reads permissions from the input csv file."""
     permissions: list[WSPermission] = []
-    with open(csv_path, "r") as f:
+    with open(
+        csv_path,
+        "r",
+        encoding="utf-8",
+        newline="",
+        buffering=CSV_READ_BUFFER_SIZE,
+    ) as f:
         reader = csv.reader(f, skipinitialspace=True)
         next(reader)  # Skip header
         for row in reader:
@@ -418,7 +418,7 @@ def read_permissions_from_csv(csv_path: str) -> list[WSPermission]:
             try:
                 permission = WSPermission.from_csv_row(row)
             except Exception as e:
-                logger.error(f'Unable to load following row: "{row}". Error: "{e}"')
+                logger.error('Unable to load following row: "%s". Error: "%s"', row, e)
                 continue
             permissions.append(permission)
     return permissions
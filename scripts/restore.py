@@ -2,19 +2,28 @@
 import abc
 import argparse
 import csv
+import io
 import json
 import logging
 import os
+import shutil
 import tempfile
+import threading
 import traceback
 import requests
 import sys
 import yaml
 import zipfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Optional, TypeAlias, Type
+from typing import Any, Iterable, Optional, TypeAlias, Type
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from requests.adapters import HTTPAdapter, Retry
 from gooddata_sdk import (
     GoodDataSdk,
     CatalogDeclarativeAnalytics,
@@ -26,6 +35,17 @@ LAYOUTS_DIR = "gooddata_layouts"
 AM_DIR = "analytics_model"
 LDM_DIR = "ldm"
 UDF_DIR = "user_data_filters"
+LAYOUTS_ARCHIVE = f"{LAYOUTS_DIR}.zip"
+REQUIRED_LAYOUT_DIRS = frozenset((AM_DIR, LDM_DIR, UDF_DIR))
+CSV_READ_BUFFER_SIZE = 1024 * 1024
+
+S3_TRANSFER_CHUNK_SIZE = 8 * 1024 * 1024
+S3_DEFAULT_MAX_CONCURRENCY = 10
+S3_LIST_MAX_KEYS = 3
+S3_PREFETCH_WORKERS = 16
+S3_MAX_POOL_CONNECTIONS = 32
+# Archives smaller than this are kept in memory instead of written to disk.
+S3_IN_MEMORY_THRESHOLD = 32 * 1024 * 1024
 
 PROFILES_FILE = "profiles.yaml"
 PROFILES_DIRECTORY = ".gooddata"
@@ -38,7 +58,13 @@ handler.setFormatter(logging.Formatter(fmt=LOG_FORMAT))
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml bindings are not available
+    from yaml import SafeLoader
+
 GDWorkspace: TypeAlias = tuple[CatalogDeclarativeModel, CatalogDeclarativeAnalytics]
+BackupArchive: TypeAlias = Path | io.BytesIO
 
 
 class GoodDataRestApiError(Exception):
@@ -59,7 +85,7 @@ class BackupRestoreConfig:
     @staticmethod
     def _load_conf(path: str) -> dict[str, Any]:
         with open(path, "r") as conf:
-            return yaml.safe_load(conf)
+            return yaml.load(conf, Loader=SafeLoader)
 
 
 class BackupStorage(abc.ABC):
@@ -70,9 +96,18 @@ class BackupStorage(abc.ABC):
     """
 
     @abc.abstractmethod
-    def get_ws_declaration(self, target_path: str, local_target_path: Path) -> None:
+    def get_ws_declaration(
+        self, target_path: str, local_target_path: Path
+    ) -> BackupArchive:
+        """
+        Fetches the backup archive. Returns either local_target_path the archive
+        was written to, or an in-memory buffer holding the archive.
+        """
         raise NotImplementedError
 
+    def prefetch(self, target_paths: Iterable[str]) -> None:
+        """Optionally resolves the targets ahead of the restore."""
+
 
 class S3StorageConfig:
     def __init__(self, storconf: dict[str, Any]):
@@ -80,6 +115,19 @@ class S3StorageConfig:
         suffix = "/" if not storconf["backup_path"].endswith("/") else ""
         self.backup_path: str = storconf["backup_path"] + suffix
         self.profile = storconf.get("profile", "default")
+        self.max_concurrency: int = self._validate_max_concurrency(
+            storconf.get("max_concurrency", S3_DEFAULT_MAX_CONCURRENCY)
+        )
+
+    @staticmethod
+    def _validate_max_concurrency(value: Any) -> int:
+        """Ensures that the configured max_concurrency is a positive integer."""
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            logger.error(
+                f'Invalid s3 max_concurrency "{value}", a positive integer is required.'
+            )
+            raise BackupRestoreError("InvalidMaxConcurrency")
+        return value
 
 
 class S3Storage(BackupStorage):
@@ -90,8 +138,18 @@ class S3Storage(BackupStorage):
     def __init__(self, conf: BackupRestoreConfig):
         self._config = S3StorageConfig(conf.storage)
         self._session = self._create_boto_session(self._config.profile)
-        self._api = self._session.resource("s3")
-        self._bucket = self._api.Bucket(self._config.bucket)
+        # Each restore thread gets its own low-level S3 client.
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Archive (key, size) pairs resolved by prefetch; None marks a missing backup.
+        self._resolved_archives: dict[str, Optional[tuple[str, int]]] = {}
+        # Large archives are fetched via concurrent ranged GETs.
+        self._transfer_config = TransferConfig(
+            multipart_threshold=S3_TRANSFER_CHUNK_SIZE,
+            multipart_chunksize=S3_TRANSFER_CHUNK_SIZE,
+            max_concurrency=self._config.max_concurrency,
+            use_threads=True,
+        )
         self._validate_backup_path()
 
     @staticmethod
@@ -105,24 +163,100 @@ class S3Storage(BackupStorage):
 
         return boto3.Session()
 
+    @property
+    def _client(self):
+        """S3 client bound to the calling thread."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            # boto3 sessions are not thread-safe, guard the client creation.
+            with self._lock:
+                client = self._session.client(
+                    "s3", config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+                )
+            self._local.client = client
+        return client
+
     def _validate_backup_path(self) -> None:
         """Validates if backup path exists in the S3 bucket."""
-        objects_filter = self._bucket.objects.filter(Prefix=self._config.backup_path)
-
         try:
-            objects = list(objects_filter)
+            response = self._client.list_objects_v2(
+                Bucket=self._config.bucket,
+                Prefix=self._config.backup_path,
+                MaxKeys=1,
+            )
         except Exception as e:
             raise RuntimeError(f"Error raised while validating s3 config. Error: {e}")
 
-        if len(objects) == 0:
+        if response.get("KeyCount", 0) == 0:
             raise RuntimeError("Provided s3 backup_path does not exist. Exiting...")
 
-    def get_ws_declaration(self, s3_target_path: str, local_target_path: Path) -> None:
+    def _archive_size(self, key: str) -> Optional[int]:
+        """Checks for the archive key directly, without listing the prefix.
+        Returns the archive size, or None if there is no such key."""
+        try:
+            response = self._client.head_object(Bucket=self._config.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return response["ContentLength"]
+
+    def prefetch(self, target_paths: Iterable[str]) -> None:
+        """Resolves archive keys of all targets concurrently."""
+        paths = list(dict.fromkeys(target_paths))
+        with ThreadPoolExecutor(max_workers=S3_PREFETCH_WORKERS) as executor:
+            # Consume the results so that the executor is drained before returning.
+            list(executor.map(self._try_resolve_archive, paths))
+
+    def _try_resolve_archive(self, s3_target_path: str) -> None:
+        """Resolves and caches the archive of a single target path.
+        Targets which failed for other reasons than a missing backup are left
+        uncached, to be resolved (and fail) lazily in get_ws_declaration."""
+        try:
+            self._resolved_archives[s3_target_path] = self._resolve_archive(
+                s3_target_path
+            )
+        except BackupRestoreError:
+            self._resolved_archives[s3_target_path] = None
+        except Exception as e:
+            logger.warning(f"Failed to prefetch backup of {s3_target_path}: {e}")
+
+    def get_ws_declaration(
+        self, s3_target_path: str, local_target_path: Path
+    ) -> BackupArchive:
         """Retrieves workspace declaration from S3 bucket."""
+        if s3_target_path in self._resolved_archives:
+            archive = self._resolved_archives[s3_target_path]
+            if archive is None:
+                raise BackupRestoreError(f"No target found for {s3_target_path}")
+        else:
+            archive = self._resolve_archive(s3_target_path)
+
+        key, size = archive
+        if size < S3_IN_MEMORY_THRESHOLD:
+            response = self._client.get_object(Bucket=self._config.bucket, Key=key)
+            return io.BytesIO(response["Body"].read())
+
+        self._download(key, local_target_path)
+        return local_target_path
+
+    def _resolve_archive(self, s3_target_path: str) -> tuple[str, int]:
+        """Finds the key and size of the backup archive under the target path."""
         s3_backup_path = self._config.backup_path
         target_s3_prefix = f"{s3_backup_path}{s3_target_path}"
 
-        objs_found = list(self._bucket.objects.filter(Prefix=target_s3_prefix))
+        expected_key = f"{target_s3_prefix.rstrip('/')}/{LAYOUTS_ARCHIVE}"
+        size = self._archive_size(expected_key)
+        if size is not None:
+            return expected_key, size
+
+        # The directory key plus two candidates is enough to detect duplicates.
+        response = self._client.list_objects_v2(
+            Bucket=self._config.bucket,
+            Prefix=target_s3_prefix,
+            MaxKeys=S3_LIST_MAX_KEYS,
+        )
+        objs_found = [(obj["Key"], obj["Size"]) for obj in response.get("Contents", [])]
 
         # Remove the included directory (which equals prefix) on hit
         objs_found = objs_found[1:] if len(objs_found) > 0 else objs_found
@@ -137,19 +271,53 @@ class S3Storage(BackupStorage):
                 " Continuing with the first one, ignoring the rest..."
             )
 
-        s3_obj = objs_found[0]
-        self._bucket.download_file(s3_obj.key, local_target_path)
+        return objs_found[0]
+
+    def _download(self, key: str, local_target_path: Path) -> None:
+        self._client.download_file(
+            self._config.bucket,
+            key,
+            str(local_target_path),
+            Config=self._transfer_config,
+        )
 
 
 MaybeResponse: TypeAlias = Optional[requests.Response]
 
 
 class GDApi:
-    def __init__(self, host: str, api_token: str, headers: dict[str, Any] = {}):
+    def __init__(
+        self, host: str, api_token: str, headers: Optional[dict[str, Any]] = None
+    ):
+        if not api_token:
+            raise RuntimeError(
+                "Token required for authentication against GD API is missing."
+            )
         self.endpoint = self._handle_endpoint(host)
         self.api_token = api_token
-        self.headers = headers
+        self.headers = headers if headers else {}
         self.wait_api_time = 10
+        self._session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        """
+        Creates HTTP session reusing keep-alive connections to the GoodData API
+        and retrying requests which failed on transient gateway errors.
+        """
+        session = requests.Session()
+        # The last response is returned once retries are exhausted,
+        # so that its status is handled by _resolve_return_code.
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retries)
+        session.mount("https://", adapter)
+        session.headers.update(self.headers)
+        session.headers["Authorization"] = f"{BEARER_TKN_PREFIX} {self.api_token}"
+        return session
 
     @staticmethod
     def _handle_endpoint(host: str) -> str:
@@ -160,44 +328,30 @@ class GDApi:
         self, path: str, request: dict[str, Any], ok_code: int = 200
     ) -> requests.Response:
         """Sends a PUT request to the GoodData API."""
-        kwargs = self._prepare_request(path)
-        kwargs["headers"]["Content-Type"] = "application/json"
-        kwargs["json"] = request
-        logger.debug(f"PUT request: {json.dumps(request)}")
-        response = requests.put(**kwargs)
+        url = f"{self.endpoint}/{path}"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PUT request: %s", json.dumps(request))
+        response = self._session.put(
+            url,
+            headers={"Content-Type": "application/json"},
+            json=request,
+        )
         resolved_response = self._resolve_return_code(
-            response, ok_code, kwargs["url"], "RestApi.put"
+            response, ok_code, url, "RestApi.put"
         )
         assert resolved_response is not None
         return resolved_response
 
-    def _prepare_request(self, path: str, params=None) -> dict[str, Any]:
-        """Prepares the request to be sent to the GoodData API."""
-        kwargs: dict[str, Any] = {
-            "url": f"{self.endpoint}/{path}",
-            "headers": self.headers.copy(),
-        }
-        if params:
-            kwargs["params"] = params
-        if self.api_token:
-            kwargs["headers"]["Authorization"] = f"{BEARER_TKN_PREFIX} {self.api_token}"
-        else:
-            raise RuntimeError(
-                "Token required for authentication against GD API is missing."
-            )
-
-        return kwargs
-
     @staticmethod
     def _resolve_return_code(
         response, ok_code: int, url, method, not_found_code: Optional[int] = None
     ) -> MaybeResponse:
         """Resolves the return code of the response."""
         if response.status_code == ok_code:
-            logger.debug(f"{method} to {url} succeeded")
+            logger.debug("%s to %s succeeded", method, url)
             return response
         if not_found_code and response.status_code == not_found_code:
-            logger.debug(f"{method} to {url} failed - target not found")
+            logger.debug("%s to %s failed - target not found", method, url)
             return None
         raise GoodDataRestApiError(
             f"{method} to {url} failed - "
@@ -205,6 +359,17 @@ class GDApi:
         )
 
 
+def positive_int(value: str) -> int:
+    """Parses a strictly positive integer command line argument."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{value}" is not an integer.')
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'"{value}" must be a positive integer.')
+    return number
+
+
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -227,6 +392,13 @@ def create_parser() -> argparse.ArgumentParser:
         default="default",
         help='GoodData profile to use. If not profile is provided, "default" is used.',
     )
+    parser.add_argument(
+        "-w",
+        "--max-workers",
+        type=positive_int,
+        default=1,
+        help="Number of workspaces restored concurrently. Defaults to 1.",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Turns on the debug log output."
     )
@@ -237,22 +409,25 @@ def read_targets_from_csv(csv_path: str) -> dict[str, str]:
     """Reads the csv file with workspace IDs and paths to backups."""
     # TODO - handling of csv files with and without headers
     # TODO - handling csv files with unsupported structure/schema
-    ws_paths: dict[str, str] = {}
-    with open(csv_path, "r") as f:
+    with open(
+        csv_path,
+        "r",
+        encoding="utf-8",
+        newline="",
+        buffering=CSV_READ_BUFFER_SIZE,
+    ) as f:
         reader = csv.reader(f, skipinitialspace=True)
         next(reader)  # Skip header
-        for row in reader:
-            ws_id, ws_path = row
-
-            if ws_paths.get(ws_id) is not None:
-                logger.warning(
-                    f'Duplicate backup targets for ws_id "{ws_id}" found. '
-                    f'Overwriting the target at "{ws_paths[ws_id]}" with "{ws_path}".'
-                )
+        targets = [(ws_id, ws_path) for ws_id, ws_path in reader]
 
-            ws_paths[ws_id] = ws_path
+    duplicates = [ws_id for ws_id, n in Counter(t[0] for t in targets).items() if n > 1]
+    if duplicates:
+        logger.warning(
+            f"Duplicate backup targets found for ws_ids {duplicates}. "
+            "Using the last target listed for each of them."
+        )
 
-    return ws_paths
+    return dict(targets)
 
 
 def validate_targets(sdk: GoodDataSdk, ws_paths: dict[str, str]) -> None:
@@ -261,18 +436,18 @@ def validate_targets(sdk: GoodDataSdk, ws_paths: dict[str, str]) -> None:
     we can let the user know in advance about unknown IDs.
     """
     ws_list = sdk.catalog_workspace.list_workspaces()
-    available_ids = {ws.id for ws in ws_list}
-    target_ids = set(ws_paths.keys())
-
-    unknown_ids = target_ids - available_ids
-    if unknown_ids:
-        logger.error(
-            "Unknown IDs specified in the input csv file. "
-            f"These will be ignored. The unknown IDs are: {unknown_ids}."
-        )
+    available_ids = frozenset(ws.id for ws in ws_list)
+    if available_ids.issuperset(ws_paths):
+        return
+
+    unknown_ids = ws_paths.keys() - available_ids
+    logger.error(
+        "Unknown IDs specified in the input csv file. "
+        f"These will be ignored. The unknown IDs are: {unknown_ids}."
+    )
 
     for ws_id in unknown_ids:
-        ws_paths.pop(ws_id)
+        ws_paths.pop(ws_id, None)
 
 
 def get_storage(storage_type: str) -> Type[BackupStorage]:
@@ -291,27 +466,35 @@ class RestoreWorker:
         api: GDApi,
         storage: BackupStorage,
         ws_paths: dict[str, str],
+        max_workers: int = 1,
     ):
         self._sdk = sdk
         self._api = api
         self._storage = storage
         self._ws_paths = ws_paths
+        self._max_workers = max_workers
         self.org_id = sdk.catalog_organization.organization_id
 
-    def _get_ws_declaration(self, ws_path: str, target: Path) -> None:
+    def _get_ws_declaration(self, ws_path: str, target: Path) -> BackupArchive:
         """Fetches the backup of workspace declaration from storage provider."""
         try:
-            self._storage.get_ws_declaration(ws_path, target)
+            return self._storage.get_ws_declaration(ws_path, target)
         except Exception as e:
             logger.error("Failed to fetch restore backup for workspace.")
             raise BackupRestoreError(type(e).__name__)
 
     @staticmethod
-    def _extract_zip_archive(target: Path, tempdir_path: Path) -> None:
+    def _extract_zip_archive(target: BackupArchive, tempdir_path: Path) -> None:
         """Extracts the backup from zip archive."""
         try:
             with zipfile.ZipFile(target, "r") as zip_ref:
-                zip_ref.extractall(tempdir_path)
+                # Only the layouts directory is read, skip everything else.
+                members = [
+                    name
+                    for name in zip_ref.namelist()
+                    if name.startswith(f"{LAYOUTS_DIR}/")
+                ]
+                zip_ref.extractall(tempdir_path, members=members)
         except Exception as e:
             logger.error("Failed to extract backup from zip archive.")
             raise BackupRestoreError(type(e).__name__)
@@ -333,12 +516,13 @@ class RestoreWorker:
     def _convert_udf_files_to_api_body(src_path: Path) -> dict:
         """Converts UDF files to API body."""
         user_data_filters: dict = {"userDataFilters": []}
-        user_data_filters_folder = os.path.join(src_path, UDF_DIR)
-        for filename in os.listdir(user_data_filters_folder):
-            f = os.path.join(user_data_filters_folder, filename)
-            with open(f, "r") as file:
-                user_data_filter = yaml.safe_load(file)
-                user_data_filters["userDataFilters"].append(user_data_filter)
+        with os.scandir(src_path / UDF_DIR) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                with open(entry.path, "r") as file:
+                    user_data_filter = yaml.load(file, Loader=SafeLoader)
+                    user_data_filters["userDataFilters"].append(user_data_filter)
 
         return user_data_filters
 
@@ -354,7 +538,7 @@ class RestoreWorker:
         """Checks if the workspace layout is valid."""
         # NOTE - this is a weaker, temporary validation.
         # Should be replaced upon SDK version bump.
-        if not src_path.exists() or not src_path.is_dir():
+        if not src_path.is_dir():
             logger.error(
                 "Invalid source path found upon backup fetch. "
                 f"Got {src_path}. "
@@ -362,16 +546,9 @@ class RestoreWorker:
             )
             raise BackupRestoreError("Invalid source path upon load.")
 
-        children = list(src_path.iterdir())
-        am_path = src_path / AM_DIR
-        ldm_path = src_path / LDM_DIR
-        udf_path = src_path / UDF_DIR
+        children = {child.name for child in src_path.iterdir()}
 
-        if (
-            am_path not in children
-            or ldm_path not in children
-            or udf_path not in children
-        ):
+        if not REQUIRED_LAYOUT_DIRS.issubset(children):
             logger.error(
                 "LDM or AM directory missing in the workspace hierarchy. "
                 "Check if gooddata_layouts contains "
@@ -402,44 +579,146 @@ class RestoreWorker:
             logger.error(f"Failed to put user data filters into {ws_id}")
             raise BackupRestoreError(type(e).__name__)
 
-    def _restore_backup(self, ws_id: str, tempdir: str) -> None:
-        """Restores the backup of a workspace."""
-        ws_path = self._ws_paths[ws_id]
-        tempdir_path = Path(tempdir)
+    def _fetch_backup(self, ws_id: str, tempdir_path: Path) -> Path:
+        """Downloads and extracts a workspace backup. Returns the layouts path."""
         zip_target = tempdir_path / f"{LAYOUTS_DIR}.zip"
         src_path = tempdir_path / LAYOUTS_DIR
 
+        archive = self._get_ws_declaration(self._ws_paths[ws_id], zip_target)
+        self._extract_zip_archive(archive, tempdir_path)
+        self._check_workspace_is_valid(src_path)
+        return src_path
+
+    def _apply_backup(self, ws_id: str, src_path: Path) -> None:
+        """Loads the extracted backup and puts it to the workspace."""
+        workspace = self._load_workspace_layout(src_path)
+        user_data_filters = self._load_user_data_filters(src_path)
+        self._put_workspace_layout(ws_id, workspace)
+        self._put_user_data_filters(ws_id, user_data_filters)
+
+    def _log_restore_failure(self, ws_id: str, e: BackupRestoreError) -> None:
+        logger.error(
+            f"Failed to restore backup of {ws_id} from {self._ws_paths[ws_id]}. "
+            f"Error caused by {e.cause}."
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Attempt to restore backup raised following error: %s. "
+                "Traceback:\n%s",
+                e.cause,
+                traceback.format_exc(),
+            )
+
+    def _download_workspace(self, ws_id: str, temp_root: Path) -> Optional[Path]:
+        """Fetches the backup of a workspace into its own temporary subdirectory."""
+        tempdir = temp_root / ws_id
+        tempdir.mkdir()
         try:
-            self._get_ws_declaration(ws_path, zip_target)
-            self._extract_zip_archive(zip_target, tempdir_path)
-            self._check_workspace_is_valid(src_path)
-            workspace = self._load_workspace_layout(src_path)
-            user_data_filters = self._load_user_data_filters(src_path)
-            self._put_workspace_layout(ws_id, workspace)
-            self._put_user_data_filters(ws_id, user_data_filters)
-            logger.info(f"Finished backup restore of {ws_id} from {ws_path}.")
+            return self._fetch_backup(ws_id, tempdir)
         except BackupRestoreError as e:
-            logger.error(
-                f"Failed to restore backup of {ws_id} from {ws_path}. "
-                f"Error caused by {e.cause}."
-            )
-            trace = traceback.format_exc()
-            logger.debug(
-                f"Attempt to restore backup raised following error: {e.cause}. "
-                f"Traceback:\n{trace}"
+            self._log_restore_failure(ws_id, e)
+            shutil.rmtree(tempdir, ignore_errors=True)
+            return None
+
+    def _apply_workspace(self, ws_id: str, src_path: Path) -> bool:
+        """Restores a fetched backup of a workspace. Returns True on success."""
+        try:
+            self._apply_backup(ws_id, src_path)
+            logger.info(
+                f"Finished backup restore of {ws_id} from {self._ws_paths[ws_id]}."
             )
+            return True
+        except BackupRestoreError as e:
+            self._log_restore_failure(ws_id, e)
+            return False
+        finally:
+            shutil.rmtree(src_path.parent, ignore_errors=True)
+
+    def _process_completed(
+        self,
+        downloads: dict[Future, str],
+        applies: dict[Future, str],
+        apply_executor: ThreadPoolExecutor,
+        failed_ws_ids: list[str],
+    ) -> None:
+        """Waits for in-flight workspaces and hands fetched ones over to restore."""
+        done, _ = wait([*downloads, *applies], return_when=FIRST_COMPLETED)
+        for future in done:
+            if future in downloads:
+                ws_id = downloads.pop(future)
+                try:
+                    src_path = future.result()
+                except Exception as e:
+                    logger.error(f"Unexpected error while restoring {ws_id}: {e}")
+                    src_path = None
+                if src_path is None:
+                    failed_ws_ids.append(ws_id)
+                    continue
+                apply_future = apply_executor.submit(
+                    self._apply_workspace, ws_id, src_path
+                )
+                applies[apply_future] = ws_id
+            else:
+                ws_id = applies.pop(future)
+                try:
+                    restored = future.result()
+                except Exception as e:
+                    logger.error(f"Unexpected error while restoring {ws_id}: {e}")
+                    restored = False
+                if not restored:
+                    failed_ws_ids.append(ws_id)
 
     def incremental_restore(self):
-        """Restores the backups of workspaces incrementally."""
-        for ws_id in self._ws_paths.keys():
-            with tempfile.TemporaryDirectory() as tempdir:
-                self._restore_backup(ws_id, tempdir)
+        """
+        Restores the backups of workspaces incrementally.
+        Backups are fetched and applied in two pipelined stages, so that
+        downloads of further workspaces overlap with the API calls
+        restoring the already fetched ones. Each stage runs up to
+        max_workers workspaces concurrently, and at most max_workers
+        fetched backups wait on disk for their restore.
+        """
+        failed_ws_ids: list[str] = []
+        downloads: dict[Future, str] = {}
+        applies: dict[Future, str] = {}
+        # Workspaces hold their extracted backup on disk from the start of
+        # the download until the end of the restore.
+        max_in_flight = 2 * self._max_workers
+        try:
+            self._storage.prefetch(self._ws_paths.values())
+        except Exception as e:
+            # Prefetching is only an optimization, targets are resolved lazily.
+            logger.warning(f"Failed to prefetch backups: {e}")
+        with (
+            tempfile.TemporaryDirectory() as temp_root,
+            ThreadPoolExecutor(max_workers=self._max_workers) as download_executor,
+            ThreadPoolExecutor(max_workers=self._max_workers) as apply_executor,
+        ):
+            for ws_id in self._ws_paths.keys():
+                while len(downloads) + len(applies) >= max_in_flight:
+                    self._process_completed(
+                        downloads, applies, apply_executor, failed_ws_ids
+                    )
+                download_future = download_executor.submit(
+                    self._download_workspace, ws_id, Path(temp_root)
+                )
+                downloads[download_future] = ws_id
+
+            while downloads or applies:
+                self._process_completed(
+                    downloads, applies, apply_executor, failed_ws_ids
+                )
+
+        if failed_ws_ids:
+            logger.error(
+                f"Failed to restore {len(failed_ws_ids)} of {len(self._ws_paths)} "
+                f"workspaces: {sorted(failed_ws_ids)}."
+            )
 
 
 def create_api_client_from_profile(profile: str, profile_config: Path) -> GDApi:
     """Creates a GoodData API client from a profile."""
     with open(profile_config, "r") as file:
-        config = yaml.safe_load(file)
+        config = yaml.load(file, Loader=SafeLoader)
 
     if profile not in config:
         raise RuntimeError(
@@ -495,7 +774,7 @@ def main(args):
     ws_paths = read_targets_from_csv(args.ws_csv)
     validate_targets(sdk, ws_paths)
 
-    restore_worker = RestoreWorker(sdk, api, storage, ws_paths)
+    restore_worker = RestoreWorker(sdk, api, storage, ws_paths, args.max_workers)
 
     logger.info("Starting incremental backup restore based on target csv file...")
     restore_worker.incremental_restore()
@@ -12,19 +12,31 @@
 
 import argparse
 import csv
+import json
 import logging
 import os
 import re
 import sys
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
 
 from gooddata_sdk import GoodDataSdk
 from gooddata_sdk.catalog.user.entity_model.user import CatalogUserGroup
 
-UG_REGEX = r"^(?!\.)[.A-Za-z0-9_-]{1,255}$"
+UG_REGEX = re.compile(r"^(?!\.)[.A-Za-z0-9_-]{1,255}$")
+DEFAULT_CONCURRENCY = 16
+CONCURRENCY_ENV_VAR = "GDC_MAX_WORKERS"
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5
+RETRYABLE_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+CSV_READ_BUFFER_SIZE = 1024 * 1024
+
+# Common spellings of "true", checked before falling back to lower().
+TRUE_VALUES = frozenset(("true", "True", "TRUE"))
 
 PROFILES_FILE = "profiles.yaml"
 PROFILES_DIRECTORY = ".gooddata"
@@ -61,6 +73,17 @@ def create_clients(args: argparse.Namespace) -> GoodDataSdk:
     )
 
 
+def positive_int(value: str) -> int:
+    """Parses a strictly positive integer command line argument."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{value}" is not an integer.')
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'"{value}" must be a positive integer.')
+    return number
+
+
 def create_parser() -> argparse.ArgumentParser:
     """Creates an argument parser."""
     parser = argparse.ArgumentParser(description="Management of users and userGroups.")
@@ -98,6 +121,15 @@ def create_parser() -> argparse.ArgumentParser:
             "which contain delimiters or quotechars."
         ),
     )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=positive_int,
+        default=None,
+        help="Maximum number of concurrent API requests. "
+        f"Defaults to the {CONCURRENCY_ENV_VAR} environment variable if set, "
+        f"otherwise to {DEFAULT_CONCURRENCY}.",
+    )
     parser.add_argument(
         "-p",
         "--profile-config",
@@ -115,6 +147,19 @@ def create_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def get_concurrency(args: argparse.Namespace) -> int:
+    """Resolves the request concurrency from the arguments or the environment."""
+    if args.concurrency is not None:
+        return args.concurrency
+    value = os.environ.get(CONCURRENCY_ENV_VAR)
+    if value is None:
+        return DEFAULT_CONCURRENCY
+    try:
+        return positive_int(value)
+    except argparse.ArgumentTypeError as e:
+        raise RuntimeError(f"Invalid {CONCURRENCY_ENV_VAR} environment variable: {e}")
+
+
 def validate_args(args: argparse.Namespace) -> None:
     """Validates the arguments provided."""
     if not os.path.exists(args.user_group_csv):
@@ -125,10 +170,10 @@ def validate_args(args: argparse.Namespace) -> None:
             "Delimiter and ParentUserGroups Delimiter cannot be the same."
         )
 
-    if args.ug_delimiter == "." or re.match(UG_REGEX, args.ug_delimiter):
+    if args.ug_delimiter == "." or UG_REGEX.match(args.ug_delimiter):
         raise RuntimeError(
             'ParentUserGroups delimiter cannot be dot (".") '
-            f'or match the following regex: "{UG_REGEX}".'
+            f'or match the following regex: "{UG_REGEX.pattern}".'
         )
 
     if len(args.quotechar) != 1:
@@ -148,7 +193,7 @@ class TargetUserGroup:
         user_group_id, user_group_name, parent_user_groups, is_active = row
         user_group_name_or_id = user_group_name or user_group_id
         parent_user_groups = (
-            parent_user_groups.split(parent_user_group_delimiter)
+            sorted(parent_user_groups.split(parent_user_group_delimiter))
             if parent_user_groups
             else []
         )
@@ -156,7 +201,7 @@ class TargetUserGroup:
             user_group_id=user_group_id,
             user_group_name=user_group_name_or_id,
             parent_user_groups=parent_user_groups,
-            is_active=str(is_active).lower() == "true",
+            is_active=is_active in TRUE_VALUES or str(is_active).lower() == "true",
         )
 
 
@@ -164,7 +209,13 @@ def read_users_groups_from_csv(args: argparse.Namespace) -> list[TargetUserGroup
     """Reads users from csv file."""
     # TODO - handling of csv files with and without headers
     user_groups: list[TargetUserGroup] = []
-    with open(args.user_group_csv, "r") as f:
+    with open(
+        args.user_group_csv,
+        "r",
+        encoding="utf-8",
+        newline="",
+        buffering=CSV_READ_BUFFER_SIZE,
+    ) as f:
         reader = csv.reader(
             f, delimiter=args.delimiter, quotechar=args.quotechar, skipinitialspace=True
         )
@@ -175,7 +226,7 @@ def read_users_groups_from_csv(args: argparse.Namespace) -> list[TargetUserGroup
             try:
                 user_group = TargetUserGroup.from_csv_row(row, args.ug_delimiter)
             except Exception as e:
-                logger.error(f'Unable to load following row: "{row}". Error: "{e}"')
+                logger.error('Unable to load following row: "%s". Error: "%s"', row, e)
                 continue
             user_groups.append(user_group)
 
@@ -190,19 +241,21 @@ def csv_row_is_valid(row: list[Any]) -> bool:
         logger.error(
             "Unable to parse csv row. "
             "Most probably an incorrect amount of values was defined. "
-            f'Skipping following row: "{row}". Error: "{e}".'
+            'Skipping following row: "%s". Error: "%s".',
+            row,
+            e,
         )
         return False
 
     if not user_group_id:
         logger.error(
-            f'user_group_id field seems to be empty. Skipping following row: "{row}".'
+            'user_group_id field seems to be empty. Skipping following row: "%s".', row
         )
         return False
 
     if not is_active:
         logger.error(
-            f'is_active field seems to be empty. Skipping following row: "{row}".'
+            'is_active field seems to be empty. Skipping following row: "%s".', row
         )
         return False
 
@@ -211,11 +264,23 @@ def csv_row_is_valid(row: list[Any]) -> bool:
 
 class UserGroupManager:
     def __init__(
-        self, client_sdk: GoodDataSdk, target_user_groups: list[TargetUserGroup]
+        self,
+        client_sdk: GoodDataSdk,
+        target_user_groups: list[TargetUserGroup],
+        concurrency: int = DEFAULT_CONCURRENCY,
     ):
+        if concurrency < 1:
+            raise RuntimeError(
+                f"Concurrency must be a positive integer, got {concurrency}."
+            )
         self.sdk = client_sdk
+        self._concurrency = concurrency
         self.target_user_groups = target_user_groups
         self.gd_user_groups = self._get_gd_user_groups()
+        self._gd_by_id = {group.id: group for group in self.gd_user_groups}
+        self._gd_sorted_parents = {
+            group.id: sorted(group.get_parents) for group in self.gd_user_groups
+        }
 
     def _get_gd_user_groups(self) -> list[CatalogUserGroup]:
         try:
@@ -225,11 +290,30 @@ class UserGroupManager:
             return []
 
     @staticmethod
-    def _is_changed(group: TargetUserGroup, existing_group: CatalogUserGroup) -> bool:
+    def _call_with_backoff(fn: Callable[..., Any], *args: Any) -> Any:
+        """Calls fn, retrying with exponential backoff on throttling and 5xx errors."""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return fn(*args)
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if attempt == MAX_RETRIES or status not in RETRYABLE_STATUS_CODES:
+                    raise
+                delay = RETRY_BACKOFF_SECONDS * 2**attempt
+                logger.debug("Request failed with %s, retrying in %ss.", status, delay)
+                time.sleep(delay)
+
+    def _run_concurrently(self, fn: Callable[..., None], items: Iterable[Any]) -> None:
+        """Calls fn for each item, keeping up to concurrency requests in flight."""
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            # Errors are handled (logged) by fn itself.
+            list(executor.map(fn, items))
+
+    def _is_changed(self, group: TargetUserGroup) -> bool:
         """Checks if user group has some changes and needs to be updated."""
-        group.parent_user_groups.sort()
-        parents_changed = group.parent_user_groups != existing_group.get_parents
-        name_changed = group.user_group_name != existing_group.name
+        group_id = group.user_group_id
+        parents_changed = group.parent_user_groups != self._gd_sorted_parents[group_id]
+        name_changed = group.user_group_name != self._gd_by_id[group_id].name
         return parents_changed or name_changed
 
     def _create_or_update_user_group(
@@ -242,24 +326,26 @@ class UserGroupManager:
             user_group_parent_ids=parent_user_groups,
         )
         try:
-            self.sdk.catalog_user.create_or_update_user_group(catalog_user_group)
+            self._call_with_backoff(
+                self.sdk.catalog_user.create_or_update_user_group, catalog_user_group
+            )
             logger.info(f"Succeeded to {action} user group {group_id}")
         except Exception as e:
             if hasattr(e, "body") and e.body:
-                message = eval(e.body).get("detail", e)
+                try:
+                    message = json.loads(e.body).get("detail", e)
+                except (ValueError, AttributeError):
+                    message = e.body
             else:
                 message = e.args[0] if e.args else str(e)
             logger.error(f"Failed to {action} user group {group_id}: {message}")
 
-    def _create_missing_user_groups(self, group_ids_to_create) -> None:
+    def _create_missing_user_groups(
+        self, groups_to_create: list[TargetUserGroup]
+    ) -> None:
         """Provisions user groups that don't exist."""
-        groups_to_create = [
-            group
-            for group in self.target_user_groups
-            if group.user_group_id in group_ids_to_create
-        ]
 
-        for group in groups_to_create:
+        def create(group: TargetUserGroup) -> None:
             logger.info(
                 f'User group "{group.user_group_id}" does not exist, creating...'
             )
@@ -270,36 +356,57 @@ class UserGroupManager:
                 "create",
             )
 
-    def _update_existing_user_groups(self, group_ids_to_update) -> None:
+        # Parents have to exist before their children are created,
+        # so the groups are created in waves of independent groups.
+        pending = groups_to_create
+        while pending:
+            pending_ids = {group.user_group_id for group in pending}
+            ready: list[TargetUserGroup] = []
+            waiting: list[TargetUserGroup] = []
+            for group in pending:
+                if pending_ids.isdisjoint(group.parent_user_groups):
+                    ready.append(group)
+                else:
+                    waiting.append(group)
+            if not ready:
+                # Cyclic parents - let the API report the failures.
+                ready, waiting = waiting, []
+            self._run_concurrently(create, ready)
+            pending = waiting
+
+    def _update_existing_user_groups(
+        self, groups_to_update: list[TargetUserGroup]
+    ) -> None:
         """Update existing user groups and update ws_permissions."""
-        groups_to_update = [
-            group
-            for group in self.target_user_groups
-            if group.user_group_id in group_ids_to_update
+        changed_groups = [
+            group for group in groups_to_update if self._is_changed(group)
         ]
 
-        existing_groups = {group.id: group for group in self.gd_user_groups}
-
-        for group in groups_to_update:
-            existing_group = existing_groups[group.user_group_id]
-            if self._is_changed(group, existing_group):
-                logger.info(f"Updating user group {group.user_group_id}...")
-                self._create_or_update_user_group(
-                    group.user_group_id,
-                    group.user_group_name,
-                    group.parent_user_groups,
-                    "update",
-                )
+        def update(group: TargetUserGroup) -> None:
+            logger.info(f"Updating user group {group.user_group_id}...")
+            self._create_or_update_user_group(
+                group.user_group_id,
+                group.user_group_name,
+                group.parent_user_groups,
+                "update",
+            )
+
+        self._run_concurrently(update, changed_groups)
 
-    def _delete_user_group(self, group_ids_to_delete) -> None:
+    def _delete_user_group(self, group_ids_to_delete: set[str]) -> None:
         """Deletes user group from the project."""
-        for user_group_id in group_ids_to_delete:
+
+        def delete(user_group_id: str) -> None:
             try:
                 logger.info(f'Deleting user group"{user_group_id}"')
-                self.sdk.catalog_user.delete_user_group(user_group_id)
+                self._call_with_backoff(
+                    self.sdk.catalog_user.delete_user_group, user_group_id
+                )
             except Exception as e:
                 logger.error(f'Failed to deleted user group "{user_group_id}": {e}')
 
+        self._run_concurrently(delete, group_ids_to_delete)
+
     def manage_user_groups(self) -> None:
         """Manages multiple users groups based on the provided input."""
 
@@ -307,26 +414,21 @@ class UserGroupManager:
             f"Starting user group management run of {len(self.target_user_groups)} user groups..."
         )
 
-        gd_group_ids = {group.id for group in self.gd_user_groups}
-
-        active_target_groups = {
-            group.user_group_id
-            for group in self.target_user_groups
-            if group.is_active is True
-        }
-        inactive_target_groups = {
-            group.user_group_id
-            for group in self.target_user_groups
-            if group.is_active is False
-        }
-
-        group_ids_to_create = active_target_groups.difference(gd_group_ids)
-        self._create_missing_user_groups(group_ids_to_create)
-
-        group_ids_to_update = active_target_groups.intersection(gd_group_ids)
-        self._update_existing_user_groups(group_ids_to_update)
-
-        group_ids_to_delete = inactive_target_groups.intersection(gd_group_ids)
+        # Keyed by id - duplicate rows of a group must not be sent concurrently,
+        # the last active row of the group wins.
+        groups_to_create: dict[str, TargetUserGroup] = {}
+        groups_to_update: dict[str, TargetUserGroup] = {}
+        group_ids_to_delete: set[str] = set()
+        for group in self.target_user_groups:
+            exists = group.user_group_id in self._gd_by_id
+            if group.is_active:
+                target = groups_to_update if exists else groups_to_create
+                target[group.user_group_id] = group
+            elif exists:
+                group_ids_to_delete.add(group.user_group_id)
+
+        self._create_missing_user_groups(list(groups_to_create.values()))
+        self._update_existing_user_groups(list(groups_to_update.values()))
         self._delete_user_group(group_ids_to_delete)
 
         logger.info("User group management run finished.")
@@ -340,8 +442,11 @@ def user_group_mgmt(args):
     try:
         validate_args(args)
         client_sdk = create_clients(args)
+        concurrency = get_concurrency(args)
         target_user_groups = read_users_groups_from_csv(args)
-        user_group_manager = UserGroupManager(client_sdk, target_user_groups)
+        user_group_manager = UserGroupManager(
+            client_sdk, target_user_groups, concurrency
+        )
         user_group_manager.manage_user_groups()
     except RuntimeError as e:
         logger.error(f"Runtime error has occurred: {e}")
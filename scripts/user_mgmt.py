@@ -5,14 +5,22 @@ import logging
 import os
 import re
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
 
 import gooddata_sdk as gd_sdk
-from gooddata_api_client.exceptions import NotFoundException
 
-UG_REGEX = r"^(?!\.)[.A-Za-z0-9_-]{1,255}$"
+UG_REGEX = re.compile(r"^(?!\.)[.A-Za-z0-9_-]{1,255}$")
+DEFAULT_CONCURRENCY = 16
+PROGRESS_LOG_INTERVAL = 1000
+USER_CSV_COLUMNS = 7
+CSV_READ_BUFFER_SIZE = 1024 * 1024
+
+# Common spellings of "true", checked before falling back to lower().
+TRUE_VALUES = frozenset(("true", "True", "TRUE"))
 
 PROFILES_FILE = "profiles.yaml"
 PROFILES_DIRECTORY = ".gooddata"
@@ -26,6 +34,17 @@ logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
 
+def positive_int(value: str) -> int:
+    """Parses a strictly positive integer command line argument."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{value}" is not an integer.')
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'"{value}" must be a positive integer.')
+    return number
+
+
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Management of users and userGroups.")
     parser.add_argument(
@@ -62,6 +81,14 @@ def create_parser() -> argparse.ArgumentParser:
             "which contain delimiters or quotechars."
         ),
     )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum number of users managed concurrently. "
+        f"Default value is {DEFAULT_CONCURRENCY}.",
+    )
     parser.add_argument(
         "-p",
         "--profile-config",
@@ -110,7 +137,12 @@ class GDUserTarget:
     ) -> "GDUserTarget":
         """Creates GDUserTarget from csv row."""
         user_id, firstname, lastname, email, auth_id, user_groups, is_active = row
-        user_groups_list = user_groups.split(user_group_delim) if user_groups else []
+        if not user_groups:
+            user_groups_list = []
+        elif user_group_delim in user_groups:
+            user_groups_list = user_groups.split(user_group_delim)
+        else:
+            user_groups_list = [user_groups]
         return GDUserTarget(
             user_id=user_id,
             firstname=optional(firstname),
@@ -118,7 +150,7 @@ class GDUserTarget:
             email=optional(email),
             auth_id=optional(auth_id),
             user_groups=user_groups_list,
-            is_active=str(is_active).lower() == "true",
+            is_active=is_active in TRUE_VALUES or str(is_active).lower() == "true",
         )
 
     @classmethod
@@ -147,29 +179,41 @@ class GDUserTarget:
 
 
 class UserManager:
-    def __init__(self, sdk: gd_sdk.GoodDataSdk):
+    def __init__(self, sdk: gd_sdk.GoodDataSdk, concurrency: int = DEFAULT_CONCURRENCY):
+        if concurrency < 1:
+            raise ValueError(
+                f"Concurrency must be a positive integer, got {concurrency}."
+            )
         self._sdk = sdk
+        self._concurrency = concurrency
+        self._group_lock = threading.Lock()
+        self._known_group_ids: set[str] = {
+            group.id for group in self._sdk.catalog_user.list_user_groups()
+        }
+        self._upstream_users: dict[str, GDUserTarget] = {
+            user.id: GDUserTarget.from_sdk_obj(user)
+            for user in self._sdk.catalog_user.list_users()
+        }
 
     def _try_get_user(self, user: GDUserTarget) -> Optional[GDUserTarget]:
-        try:
-            user_sdk_obj = self._sdk.catalog_user.get_user(user.user_id)
-            return GDUserTarget.from_sdk_obj(user_sdk_obj)
-        except NotFoundException:
-            return None
+        return self._upstream_users.get(user.user_id)
 
     def _get_or_create_user_groups(self, groups: list[str]):
         """Ensures that all user groups exist in the project."""
-        # TODO - Can be optimized - preloading all user groups and checking on the go
         for group in groups:
-            try:
-                self._sdk.catalog_user.get_user_group(group)
-            except NotFoundException:
+            if group in self._known_group_ids:
+                continue
+            with self._group_lock:
+                # Another thread might have created the group meanwhile.
+                if group in self._known_group_ids:
+                    continue
                 logger.info(f'UserGroup "{group}" doesn\'t exist - creating...')
                 self._sdk.catalog_user.create_or_update_user_group(
                     gd_sdk.CatalogUserGroup.init(
                         user_group_id=group, user_group_name=group
                     )
                 )
+                self._known_group_ids.add(group)
 
     def _create_or_update_user(self, user: GDUserTarget):
         """Creates or updates user in the project."""
@@ -184,16 +228,16 @@ class UserManager:
 
         self._get_or_create_user_groups(user.user_groups)
         self._sdk.catalog_user.create_or_update_user(user.to_sdk_obj())
+        self._upstream_users[user.user_id] = user
 
     def _delete_user(self, user: GDUserTarget):
         """Deletes user from the project."""
-        try:
-            self._sdk.catalog_user.get_user(user.user_id)
-        except NotFoundException:
+        if user.user_id not in self._upstream_users:
             logger.info(f'No action for user "{user.user_id}"')
             return
         logger.info(f'Deleting user "{user.user_id}"')
         self._sdk.catalog_user.delete_user(user.user_id)
+        del self._upstream_users[user.user_id]
 
     def manage_user(self, user: GDUserTarget):
         """Manages user based on the provided GDUserTarget."""
@@ -202,17 +246,48 @@ class UserManager:
         else:
             self._delete_user(user)
 
-    def manage_users(self, users: list[GDUserTarget]):
+    def manage_users(self, users: Iterable[GDUserTarget]):
         """Manages multiple users based on the provided GDUserTargets."""
-        logger.info(f"Starting user management run of {len(users)} users...")
-        for user in users:
-            try:
-                self.manage_user(user)
-            except GoodDataRestApiError as e:
-                logger.error(f"API request for user failed: {e}")
-            except Exception as e:
-                logger.error(f"Something went wrong for {user.user_id}. Error: {e}")
-        logger.info("User management run finished.")
+        logger.info("Starting user management run...")
+        # Rows of the same user are chained to keep their order in the input.
+        last_futures: dict[str, Future] = {}
+        pending: dict[Future, str] = {}
+        # Bounds how many rows are read from the input ahead of the API calls.
+        max_pending = 2 * self._concurrency
+        processed = 0
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            for processed, user in enumerate(users, 1):
+                previous = last_futures.get(user.user_id)
+                future = executor.submit(self._try_manage_user, user, previous)
+                last_futures[user.user_id] = future
+                pending[future] = user.user_id
+                if len(pending) >= max_pending:
+                    self._forget_finished(pending, last_futures)
+                if processed % PROGRESS_LOG_INTERVAL == 0:
+                    logger.info(f"Submitted {processed} users so far...")
+        logger.info(f"User management run of {processed} users finished.")
+
+    @staticmethod
+    def _forget_finished(
+        pending: dict[Future, str], last_futures: dict[str, Future]
+    ) -> None:
+        """Waits for some of the pending rows and drops the finished ones."""
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            user_id = pending.pop(future)
+            if last_futures.get(user_id) is future:
+                del last_futures[user_id]
+
+    def _try_manage_user(self, user: GDUserTarget, previous: Optional[Future]):
+        """Manages user once the previous row of the same user is processed."""
+        if previous is not None:
+            previous.result()
+        try:
+            self.manage_user(user)
+        except GoodDataRestApiError as e:
+            logger.error(f"API request for user failed: {e}")
+        except Exception as e:
+            logger.error(f"Something went wrong for {user.user_id}. Error: {e}")
 
 
 # TODO - simplify after complete switch to SDK
@@ -242,36 +317,44 @@ def create_clients(args: argparse.Namespace) -> gd_sdk.GoodDataSdk:
 
 def csv_row_is_valid(row: list[Any]) -> bool:
     """Validates csv row."""
-    try:
-        user_id, firstname, lastname, email, auth_id, user_groups, is_active = row
-    except Exception as e:
+    if len(row) != USER_CSV_COLUMNS:
         logger.error(
             "Unable to parse csv row. "
             "Most probably an incorrect amount of values was defined. "
-            f'Skipping following row: "{row}". Error: "{e}".'
+            'Skipping following row: "%s". Expected %d values, got %d.',
+            row,
+            USER_CSV_COLUMNS,
+            len(row),
         )
         return False
 
+    user_id, is_active = row[0], row[6]
+
     if not user_id:
         logger.error(
-            f'user_id field seems to be empty. Skipping following row: "{row}".'
+            'user_id field seems to be empty. Skipping following row: "%s".', row
         )
         return False
 
     if not is_active:
         logger.error(
-            f'is_active field seems to be empty. Skipping following row: "{row}".'
+            'is_active field seems to be empty. Skipping following row: "%s".', row
         )
         return False
 
     return True
 
 
-def read_users_from_csv(args: argparse.Namespace) -> list[GDUserTarget]:
-    """Reads users from csv file."""
+def read_users_from_csv(args: argparse.Namespace) -> Iterator[GDUserTarget]:
+    """Lazily reads users from csv file."""
     # TODO - handling of csv files with and without headers
-    users: list[GDUserTarget] = []
-    with open(args.user_csv, "r") as f:
+    with open(
+        args.user_csv,
+        "r",
+        encoding="utf-8",
+        newline="",
+        buffering=CSV_READ_BUFFER_SIZE,
+    ) as f:
         reader = csv.reader(
             f, delimiter=args.delimiter, quotechar=args.quotechar, skipinitialspace=True
         )
@@ -282,11 +365,9 @@ def read_users_from_csv(args: argparse.Namespace) -> list[GDUserTarget]:
             try:
                 user = GDUserTarget.from_csv_row(row, args.ug_delimiter)
             except Exception as e:
-                logger.error(f'Unable to load following row: "{row}". Error: "{e}"')
+                logger.error('Unable to load following row: "%s". Error: "%s"', row, e)
                 continue
-            users.append(user)
-
-    return users
+            yield user
 
 
 def validate_args(args: argparse.Namespace) -> None:
@@ -297,10 +378,10 @@ def validate_args(args: argparse.Namespace) -> None:
     if args.delimiter == args.ug_delimiter:
         raise RuntimeError("Delimiter and UserGroups Delimiter cannot be the same.")
 
-    if args.ug_delimiter == "." or re.match(UG_REGEX, args.ug_delimiter):
+    if args.ug_delimiter == "." or UG_REGEX.match(args.ug_delimiter):
         raise RuntimeError(
             'Usergroup delimiter cannot be dot (".") '
-            f'or match the following regex: "{UG_REGEX}".'
+            f'or match the following regex: "{UG_REGEX.pattern}".'
         )
 
     if len(args.quotechar) != 1:
@@ -318,7 +399,7 @@ def user_mgmt(args):
 
     sdk = create_clients(args)
 
-    user_manager = UserManager(sdk)
+    user_manager = UserManager(sdk, args.concurrency)
 
     user_manager.manage_users(users)
 
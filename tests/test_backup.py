@@ -1,7 +1,10 @@
 # (C) 2023 GoodData Corporation
 import argparse
+import http.server
 import os
+import threading
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest import mock
 
@@ -21,11 +24,15 @@ S3_BUCKET = "some-s3-bucket"
 
 
 class MockGdWorkspace:
+    __slots__ = ("id",)
+
     def __init__(self, id: str) -> None:
         self.id = id
 
 
 class MockResponse:
+    __slots__ = ("status_code", "json_response", "text")
+
     def __init__(self, status_code, json_response=None, text: str = ""):
         self.status_code = status_code
         self.json_response = json_response if json_response else {}
@@ -35,18 +42,18 @@ class MockResponse:
         return self.json_response
 
 
-def mock_requests_get(**kwargs):
+def mock_requests_get(url, **kwargs):
     body = {"userDataFilters": []}
     return MockResponse(200, body)
 
 
 def mock_requests():
-    requests = mock.Mock()
-    requests.get.side_effect = mock_requests_get
+    requests = mock.MagicMock()
+    requests.Session.return_value.get.side_effect = mock_requests_get
     return requests
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def aws_credentials():
     """
     Mocked AWS Credentials for moto.
@@ -59,32 +66,44 @@ def aws_credentials():
     os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def s3(aws_credentials):
     with mock_s3():
         yield boto3.resource("s3")
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def s3_bucket(s3):
     s3.create_bucket(Bucket=S3_BUCKET)
     yield s3.Bucket(S3_BUCKET)
 
 
 @pytest.fixture(scope="function")
-def create_backups_in_bucket(s3_bucket):
+def clean_s3_bucket(s3_bucket):
+    """Empties the shared mocked bucket after each test that uses it."""
+    yield s3_bucket
+    s3_bucket.objects.all().delete()
+
+
+@pytest.fixture(scope="function")
+def create_backups_in_bucket(clean_s3_bucket):
     def create_backups(ws_ids: list[str], is_e2e: bool = False, suffix: str = "bla"):
         # If used within e2e test, add some suffix to path
         # in order to simulate a more realistic scenario
         path_suffix = f"/{suffix}" if is_e2e else ""
 
+        keys = []
         for ws_id in ws_ids:
-            s3_bucket.put_object(
-                Bucket=S3_BUCKET, Key=f"{S3_BACKUP_PATH}{ws_id}{path_suffix}/"
-            )
-            s3_bucket.put_object(
-                Bucket=S3_BUCKET,
-                Key=f"{S3_BACKUP_PATH}{ws_id}{path_suffix}/gooddata_layouts.zip",
+            keys.append(f"{S3_BACKUP_PATH}{ws_id}{path_suffix}/")
+            keys.append(f"{S3_BACKUP_PATH}{ws_id}{path_suffix}/gooddata_layouts.zip")
+
+        # boto3 clients (unlike resources) are safe to share between threads
+        client = clean_s3_bucket.meta.client
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(
+                executor.map(
+                    lambda key: client.put_object(Bucket=S3_BUCKET, Key=key), keys
+                )
             )
 
     return create_backups
@@ -168,12 +187,20 @@ def test_get_unknown_storage_raises_error():
         backup.get_storage("unknown_storage")
 
 
+def clone_test_exports(dst: Path) -> None:
+    """Hardlinks the test exports into dst, copying if linking is unsupported."""
+    src = Path("tests/data/backup/test_exports/services/")
+    try:
+        shutil.copytree(src, dst, copy_function=os.link)
+    except OSError:
+        shutil.rmtree(dst, ignore_errors=True)
+        shutil.copytree(src, dst)
+
+
 # Test that zipping gooddata_layouts folder works
 def test_archive_gooddata_layouts_to_zip():
     with tempfile.TemporaryDirectory() as tmpdir:
-        shutil.copytree(
-            Path("tests/data/backup/test_exports/services/"), Path(tmpdir + "/services")
-        )
+        clone_test_exports(Path(tmpdir + "/services"))
         backup.archive_gooddata_layouts_to_zip(Path(tmpdir, "services"))
 
         zip_exists = os.path.isfile(
@@ -224,6 +251,38 @@ def test_get_user_data_filters_normal_response(requests):
     assert response == {"userDataFilters": []}
 
 
+class UnavailableHandler(http.server.BaseHTTPRequestHandler):
+    requests_received = 0
+
+    def do_GET(self):
+        UnavailableHandler.requests_received += 1
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@mock.patch("urllib3.util.retry.Retry.sleep")
+def test_get_user_data_filters_retries_exhausted(_, caplog):
+    UnavailableHandler.requests_received = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), UnavailableHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        api = backup.GDApi(f"http://127.0.0.1:{server.server_port}", "token")
+        # The retrying adapter is only mounted for https by default.
+        api._session.mount("http://", api._session.get_adapter("https://"))
+        response = backup.get_user_data_filters(api, "workspace")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response is None
+    assert UnavailableHandler.requests_received == 4
+    assert "response_code=503" in caplog.text
+
+
 def test_store_user_data_filters():
     user_data_filters = {
         "userDataFilters": [
@@ -252,21 +311,12 @@ def test_store_user_data_filters():
         "services",
         "wsid1",
     )
-    user_data_filter_folder = os.path.isdir(Path(user_data_filter_folderlocation))
-    user_data_filter2 = os.path.isfile(
-        Path(f"{user_data_filter_folderlocation}/datafilter2.yaml")
-    )
-    user_data_filter4 = os.path.isfile(
-        Path(f"{user_data_filter_folderlocation}/datafilter4.yaml")
-    )
-    assert user_data_filter_folder
-    assert user_data_filter2
-    assert user_data_filter4
+    assert user_data_filter_folderlocation.is_dir()
+    assert (user_data_filter_folderlocation / "datafilter2.yaml").is_file()
+    assert (user_data_filter_folderlocation / "datafilter4.yaml").is_file()
 
-    count = 0
-    for path in os.listdir(user_data_filter_folderlocation):
-        if os.path.isfile(os.path.join(user_data_filter_folderlocation, path)):
-            count += 1
+    with os.scandir(user_data_filter_folderlocation) as entries:
+        count = sum(1 for entry in entries if entry.is_file())
 
     assert count == 2
 
@@ -278,9 +328,7 @@ def test_store_user_data_filters():
 def test_local_storage_export():
     with tempfile.TemporaryDirectory() as tmpdir:
         org_store_location = Path(tmpdir + "/services")
-        shutil.copytree(
-            Path("tests/data/backup/test_exports/services/"), org_store_location
-        )
+        clone_test_exports(org_store_location)
 
         local_storage_type = backup.get_storage("local")
         local_storage_type.export(
@@ -318,7 +366,7 @@ def test_local_storage_export():
         shutil.rmtree("tests/data/local_export")
 
 
-def test_file_upload(s3, s3_bucket):
+def test_file_upload(s3, clean_s3_bucket):
     conf = backup.BackupRestoreConfig(TEST_CONF_PATH)
     s3storage = backup.get_storage("s3")(conf)
     s3storage.export("tests/data/backup/test_exports", "services")
@@ -1,5 +1,6 @@
 # (C) 2023 GoodData Corporation
 import argparse
+from operator import attrgetter
 from unittest import mock
 
 import gooddata_sdk as gd_sdk
@@ -18,14 +19,14 @@ UG_3 = gd_sdk.CatalogAssigneeIdentifier(id="ug_3", type="userGroup")
 
 UPSTREAM_PERMISSIONS = [
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="ANALYZE", assignee=USER_1),
-    gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="VIEW", assignee=USER_1),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="MANAGE", assignee=USER_1),
+    gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="VIEW", assignee=USER_1),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="ANALYZE", assignee=USER_2),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="VIEW", assignee=USER_2),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="ANALYZE", assignee=USER_3),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="ANALYZE", assignee=UG_1),
-    gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="VIEW", assignee=UG_1),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="MANAGE", assignee=UG_1),
+    gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="VIEW", assignee=UG_1),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="ANALYZE", assignee=UG_2),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="VIEW", assignee=UG_2),
     gd_sdk.CatalogDeclarativeSingleWorkspacePermission(name="ANALYZE", assignee=UG_3),
@@ -33,14 +34,14 @@ UPSTREAM_PERMISSIONS = [
 
 WS_PERMISSION_DECLARATION = permission_mgmt.WSPermissionDeclaration(
     users={
-        "user_1": {"ANALYZE": True, "VIEW": True, "MANAGE": True},
-        "user_2": {"ANALYZE": True, "VIEW": True},
-        "user_3": {"ANALYZE": True},
+        "user_1": {"ANALYZE", "VIEW", "MANAGE"},
+        "user_2": {"ANALYZE", "VIEW"},
+        "user_3": {"ANALYZE"},
     },
     user_groups={
-        "ug_1": {"ANALYZE": True, "VIEW": True, "MANAGE": True},
-        "ug_2": {"ANALYZE": True, "VIEW": True},
-        "ug_3": {"ANALYZE": True},
+        "ug_1": {"ANALYZE", "VIEW", "MANAGE"},
+        "ug_2": {"ANALYZE", "VIEW"},
+        "ug_3": {"ANALYZE"},
     },
 )
 
@@ -127,12 +128,12 @@ def test_declaration_to_populated_sdk_api_obj():
 
 def test_declaration_with_inactive_to_sdk_api_obj():
     users = {
-        "user_1": {"ANALYZE": True, "VIEW": False},
-        "user_2": {"ANALYZE": True},
+        "user_1": {"ANALYZE"},
+        "user_2": {"ANALYZE"},
     }
     ugs = {
-        "ug_1": {"ANALYZE": True, "VIEW": False},
-        "ug_2": {"ANALYZE": True},
+        "ug_1": {"ANALYZE"},
+        "ug_2": {"ANALYZE"},
     }
     declaration = permission_mgmt.WSPermissionDeclaration(users, ugs)
     api_obj = declaration.to_sdk_api()
@@ -157,12 +158,12 @@ def test_declaration_with_inactive_to_sdk_api_obj():
 
 def test_declaration_with_only_inactive_to_sdk_api_obj():
     users = {
-        "user_1": {"ANALYZE": False, "VIEW": False},
-        "user_2": {"ANALYZE": False},
+        "user_1": set(),
+        "user_2": set(),
     }
     ugs = {
-        "ug_1": {"ANALYZE": False, "VIEW": False},
-        "ug_2": {"ANALYZE": False},
+        "ug_1": set(),
+        "ug_2": set(),
     }
     declaration = permission_mgmt.WSPermissionDeclaration(users, ugs)
     api_obj = declaration.to_sdk_api()
@@ -174,80 +175,94 @@ def test_declaration_with_only_inactive_to_sdk_api_obj():
 # in subsequent calls and to avoid dict deepcopy overhead.
 
 
+def upsert(declaration, *permissions):
+    declaration.upsert_permissions(
+        sorted(permissions, key=attrgetter("type", "id", "permission"))
+    )
+
+
 def test_add_new_active_user_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("MANAGE", "", "user_1", "user", True)
-    declaration.add_permission(permission)
-    assert declaration.users == {
-        "user_1": {"ANALYZE": True, "VIEW": False, "MANAGE": True}
-    }
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    upsert(
+        declaration, permission_mgmt.WSPermission("MANAGE", "", "user_1", "user", True)
+    )
+    assert declaration.users == {"user_1": {"MANAGE"}}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 def test_add_new_inactive_user_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("MANAGE", "", "user_1", "user", False)
-    declaration.add_permission(permission)
-    assert declaration.users == {
-        "user_1": {"ANALYZE": True, "VIEW": False, "MANAGE": False}
-    }
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    upsert(
+        declaration, permission_mgmt.WSPermission("MANAGE", "", "user_1", "user", False)
+    )
+    assert declaration.users == {"user_1": set()}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 def test_overwrite_inactive_user_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
+    )
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("VIEW", "", "user_1", "user", False),
+        permission_mgmt.WSPermission("VIEW", "", "user_1", "user", True),
     )
-    permission = permission_mgmt.WSPermission("VIEW", "", "user_1", "user", True)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": True}}
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    assert declaration.users == {"user_1": {"VIEW"}}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 def test_overwrite_active_user_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("ANALYZE", "", "user_1", "user", False)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("ANALYZE", "", "user_1", "user", True),
+        permission_mgmt.WSPermission("ANALYZE", "", "user_1", "user", False),
+    )
+    assert declaration.users == {"user_1": {"ANALYZE"}}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 def test_add_new_user_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
+    )
+    upsert(
+        declaration, permission_mgmt.WSPermission("VIEW", "", "user_2", "user", True)
     )
-    permission = permission_mgmt.WSPermission("VIEW", "", "user_2", "user", True)
-    declaration.add_permission(permission)
     assert declaration.users == {
-        "user_1": {"ANALYZE": True, "VIEW": False},
-        "user_2": {"VIEW": True},
+        "user_1": {"ANALYZE"},
+        "user_2": {"VIEW"},
     }
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 def test_modify_one_of_user_perms():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}, "user_2": {"VIEW": True}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}, "user_2": {"VIEW"}},
+        {"ug_1": {"VIEW"}},
+    )
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("ANALYZE", "", "user_1", "user", True),
+        permission_mgmt.WSPermission("MANAGE", "", "user_1", "user", True),
     )
-    permission = permission_mgmt.WSPermission("MANAGE", "", "user_1", "user", True)
-    declaration.add_permission(permission)
     assert declaration.users == {
-        "user_1": {"ANALYZE": True, "VIEW": False, "MANAGE": True},
-        "user_2": {"VIEW": True},
+        "user_1": {"ANALYZE", "MANAGE"},
+        "user_2": {"VIEW"},
     }
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 # Add userGroup permission
@@ -255,97 +270,113 @@ def test_modify_one_of_user_perms():
 
 def test_add_new_active_ug_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("MANAGE", "", "ug_1", "userGroup", True)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
-    assert declaration.user_groups == {
-        "ug_1": {"VIEW": True, "ANALYZE": False, "MANAGE": True}
-    }
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("MANAGE", "", "ug_1", "userGroup", True),
+    )
+    assert declaration.users == {"user_1": {"ANALYZE"}}
+    assert declaration.user_groups == {"ug_1": {"MANAGE"}}
 
 
 def test_add_new_inactive_ug_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("MANAGE", "", "ug_1", "userGroup", False)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
-    assert declaration.user_groups == {
-        "ug_1": {"VIEW": True, "ANALYZE": False, "MANAGE": False}
-    }
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("MANAGE", "", "ug_1", "userGroup", False),
+    )
+    assert declaration.users == {"user_1": {"ANALYZE"}}
+    assert declaration.user_groups == {"ug_1": set()}
 
 
 def test_overwrite_inactive_ug_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("ANALYZE", "", "ug_1", "userGroup", True)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": True}}
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("ANALYZE", "", "ug_1", "userGroup", False),
+        permission_mgmt.WSPermission("ANALYZE", "", "ug_1", "userGroup", True),
+    )
+    assert declaration.users == {"user_1": {"ANALYZE"}}
+    assert declaration.user_groups == {"ug_1": {"ANALYZE"}}
 
 
 def test_overwrite_active_ug_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
+    )
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("VIEW", "", "ug_1", "userGroup", True),
+        permission_mgmt.WSPermission("VIEW", "", "ug_1", "userGroup", False),
     )
-    permission = permission_mgmt.WSPermission("VIEW", "", "ug_1", "userGroup", False)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
-    assert declaration.user_groups == {"ug_1": {"VIEW": True, "ANALYZE": False}}
+    assert declaration.users == {"user_1": {"ANALYZE"}}
+    assert declaration.user_groups == {"ug_1": {"VIEW"}}
 
 
 def test_add_new_ug_perm():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}},
     )
-    permission = permission_mgmt.WSPermission("VIEW", "", "ug_2", "userGroup", True)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("VIEW", "", "ug_2", "userGroup", True),
+    )
+    assert declaration.users == {"user_1": {"ANALYZE"}}
     assert declaration.user_groups == {
-        "ug_1": {"VIEW": True, "ANALYZE": False},
-        "ug_2": {"VIEW": True},
+        "ug_1": {"VIEW"},
+        "ug_2": {"VIEW"},
     }
 
 
 def test_modify_one_of_ug_perms():
     declaration = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True, "VIEW": False}},
-        {"ug_1": {"VIEW": True, "ANALYZE": False}, "ug_2": {"VIEW": True}},
+        {"user_1": {"ANALYZE"}},
+        {"ug_1": {"VIEW"}, "ug_2": {"VIEW"}},
+    )
+    upsert(
+        declaration,
+        permission_mgmt.WSPermission("VIEW", "", "ug_1", "userGroup", True),
+        permission_mgmt.WSPermission("MANAGE", "", "ug_1", "userGroup", True),
     )
-    permission = permission_mgmt.WSPermission("MANAGE", "", "ug_1", "userGroup", True)
-    declaration.add_permission(permission)
-    assert declaration.users == {"user_1": {"ANALYZE": True, "VIEW": False}}
+    assert declaration.users == {"user_1": {"ANALYZE"}}
     assert declaration.user_groups == {
-        "ug_1": {"VIEW": True, "ANALYZE": False, "MANAGE": True},
-        "ug_2": {"VIEW": True},
+        "ug_1": {"VIEW", "MANAGE"},
+        "ug_2": {"VIEW"},
     }
 
 
-def test_upsert():
+def test_upsert_permissions():
     owner = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"ANALYZE": True}, "user_2": {"VIEW": True}},
-        {"ug_1": {"ANALYZE": True}, "ug_2": {"VIEW": True}},
+        {"user_1": {"ANALYZE"}, "user_2": {"VIEW"}},
+        {"ug_1": {"ANALYZE"}, "ug_2": {"VIEW"}},
     )
-    other = permission_mgmt.WSPermissionDeclaration(
-        {"user_1": {"MANAGE": True, "VIEW": False}},
-        {"ug_2": {"MANAGE": True, "VIEW": False}},
+    permissions = [
+        permission_mgmt.WSPermission("MANAGE", "ws_id", "user_1", "user", False),
+        permission_mgmt.WSPermission("MANAGE", "ws_id", "user_1", "user", True),
+        permission_mgmt.WSPermission("VIEW", "ws_id", "user_1", "user", True),
+        permission_mgmt.WSPermission("VIEW", "ws_id", "user_1", "user", False),
+        permission_mgmt.WSPermission("VIEW", "ws_id", "ug_2", "userGroup", False),
+    ]
+    owner.upsert_permissions(
+        sorted(permissions, key=lambda p: (p.type, p.id, p.permission))
     )
-    owner.upsert(other)
     assert owner.users == {
-        "user_1": {"MANAGE": True, "VIEW": False},
-        "user_2": {"VIEW": True},
+        "user_1": {"MANAGE", "VIEW"},
+        "user_2": {"VIEW"},
     }
     assert owner.user_groups == {
-        "ug_1": {"ANALYZE": True},
-        "ug_2": {"MANAGE": True, "VIEW": False},
+        "ug_1": {"ANALYZE"},
+        "ug_2": set(),
     }
 
 
@@ -1,14 +1,20 @@
 # (C) 2023 GoodData Corporation
 import argparse
+import http.server
+import io
 import logging
 import os
 import tempfile
+import threading
+import time
 import json
+import zipfile
 from pathlib import Path
 from unittest import mock
 
 import boto3
 import pytest
+from botocore.exceptions import ClientError
 from moto import mock_s3
 import gooddata_sdk as gd_sdk
 
@@ -165,6 +171,94 @@ def test_s3_storage(create_backups_in_bucket):
         storage.get_ws_declaration("ws_id/", target_path)
 
 
+def test_s3_storage_falls_back_to_listing(s3_bucket):
+    s3_bucket.put_object(Bucket=S3_BUCKET, Key=f"{S3_BACKUP_PATH}ws_id/")
+    s3_bucket.put_object(Bucket=S3_BUCKET, Key=f"{S3_BACKUP_PATH}ws_id/other.zip")
+
+    conf = restore.BackupRestoreConfig(TEST_CONF_PATH)
+    storage = restore.S3Storage(conf)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        target_path = Path(tempdir, MOCK_DL_TARGET)
+        archive = storage.get_ws_declaration("ws_id/", target_path)
+        assert isinstance(archive, io.BytesIO)
+
+
+@mock.patch("scripts.restore.S3_IN_MEMORY_THRESHOLD", 0)
+def test_s3_storage_large_archive_downloaded(create_backups_in_bucket):
+    create_backups_in_bucket(["ws_id"])
+
+    conf = restore.BackupRestoreConfig(TEST_CONF_PATH)
+    storage = restore.S3Storage(conf)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        target_path = Path(tempdir, MOCK_DL_TARGET)
+        archive = storage.get_ws_declaration("ws_id/", target_path)
+        assert archive == target_path
+        assert target_path.exists()
+
+
+def test_s3_storage_prefetch(create_backups_in_bucket):
+    create_backups_in_bucket(["ws_id"])
+
+    conf = restore.BackupRestoreConfig(TEST_CONF_PATH)
+    storage = restore.S3Storage(conf)
+    storage.prefetch(["ws_id/", "bad_target/"])
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        target_path = Path(tempdir, MOCK_DL_TARGET)
+        archive = storage.get_ws_declaration("ws_id/", target_path)
+        assert isinstance(archive, io.BytesIO)
+
+    with pytest.raises(restore.BackupRestoreError):
+        storage.get_ws_declaration("bad_target/", MOCK_DL_TARGET)
+
+
+def forbid_archive_of(ws_id: str):
+    """Makes the head_object lookup of one workspace archive fail with 403."""
+    archive_size = restore.S3Storage._archive_size
+
+    def _archive_size(self, key: str):
+        if f"/{ws_id}/" in key:
+            raise ClientError({"Error": {"Code": "403"}}, "HeadObject")
+        return archive_size(self, key)
+
+    return mock.patch.object(restore.S3Storage, "_archive_size", _archive_size)
+
+
+def test_s3_storage_prefetch_error_resolved_lazily(create_backups_in_bucket):
+    create_backups_in_bucket(["ws_id_1", "ws_id_2"])
+
+    conf = restore.BackupRestoreConfig(TEST_CONF_PATH)
+    storage = restore.S3Storage(conf)
+    with forbid_archive_of("ws_id_1"):
+        storage.prefetch(["ws_id_1/", "ws_id_2/"])
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        target_path = Path(tempdir, MOCK_DL_TARGET)
+        for ws_path in ("ws_id_1/", "ws_id_2/"):
+            archive = storage.get_ws_declaration(ws_path, target_path)
+            assert isinstance(archive, io.BytesIO)
+
+
+@pytest.mark.parametrize("max_concurrency", [0, -1, "many", True])
+def test_s3_storage_config_invalid_max_concurrency(max_concurrency):
+    storconf = {
+        "bucket": S3_BUCKET,
+        "backup_path": S3_BACKUP_PATH,
+        "max_concurrency": max_concurrency,
+    }
+    with pytest.raises(restore.BackupRestoreError):
+        restore.S3StorageConfig(storconf)
+
+
+def test_s3_storage_config_max_concurrency():
+    storconf = {"bucket": S3_BUCKET, "backup_path": S3_BACKUP_PATH}
+    assert restore.S3StorageConfig(storconf).max_concurrency == 10
+    storconf["max_concurrency"] = 4
+    assert restore.S3StorageConfig(storconf).max_concurrency == 4
+
+
 def test_s3_storage_no_target_only_dir(s3_bucket):
     s3_bucket.put_object(Bucket=S3_BUCKET, Key=f"{S3_BACKUP_PATH}/ws_id/")
     conf = restore.BackupRestoreConfig(TEST_CONF_PATH)
@@ -188,6 +282,89 @@ def test_init_ldm_with_ws_data_filter_cols():
     assert len(model.ldm.datasets) == 1
 
 
+def test_read_targets_from_csv_duplicates(caplog):
+    with tempfile.TemporaryDirectory() as tempdir:
+        csv_path = Path(tempdir, "targets.csv")
+        csv_path.write_text(
+            "workspace_id,path\nws_id_1,ws_id_1/a\nws_id_2,ws_id_2/a\nws_id_1,ws_id_1/b\n"
+        )
+
+        ws_paths = restore.read_targets_from_csv(str(csv_path))
+
+    assert ws_paths == {"ws_id_1": "ws_id_1/b", "ws_id_2": "ws_id_2/a"}
+    assert len(caplog.record_tuples) == 1
+    _, level, msg = caplog.record_tuples[0]
+    assert level == logging.WARNING
+    assert "ws_id_1" in msg
+
+
+def test_gd_api_missing_token_raises_error():
+    with pytest.raises(RuntimeError):
+        restore.GDApi("some.host.com", "")
+
+
+class UnavailableHandler(http.server.BaseHTTPRequestHandler):
+    requests_received = 0
+
+    def do_PUT(self):
+        UnavailableHandler.requests_received += 1
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@mock.patch("urllib3.util.retry.Retry.sleep")
+def test_gd_api_put_retries_exhausted(_):
+    UnavailableHandler.requests_received = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), UnavailableHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        api = restore.GDApi(f"http://127.0.0.1:{server.server_port}", "token")
+        # The retrying adapter is only mounted for https by default.
+        api._session.mount("http://", api._session.get_adapter("https://"))
+        with pytest.raises(restore.GoodDataRestApiError, match="response_code=503"):
+            api.put("layout/workspaces/ws_id/userDataFilters", {}, 204)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert UnavailableHandler.requests_received == 4
+
+
+@mock.patch("scripts.restore.requests")
+def test_gd_api_put(requests):
+    session = requests.Session.return_value
+    session.put.return_value.status_code = 204
+    api = restore.GDApi("some.host.com", "token")
+
+    api.put("layout/workspaces/ws_id/userDataFilters", {"userDataFilters": []}, 204)
+
+    assert session.headers.__setitem__.call_args == mock.call(
+        "Authorization", "Bearer token"
+    )
+    session.put.assert_called_once_with(
+        "some.host.com/api/v1/layout/workspaces/ws_id/userDataFilters",
+        headers={"Content-Type": "application/json"},
+        json={"userDataFilters": []},
+    )
+
+
+@pytest.mark.parametrize("max_workers", ["0", "-1", "many"])
+def test_invalid_max_workers_rejected(max_workers):
+    parser = restore.create_parser()
+    with pytest.raises(SystemExit):
+        parser.parse_args(["ws.csv", "conf.yaml", "-w", max_workers])
+
+
+def test_max_workers_parsed():
+    args = restore.create_parser().parse_args(["ws.csv", "conf.yaml", "-w", "4"])
+    assert args.max_workers == 4
+
+
 def test_validate_targets(caplog):
     sdk = mock.Mock()
     sdk.catalog_workspace.list_workspaces.return_value = [
@@ -218,9 +395,23 @@ def test_bad_s3_path_raises_error(s3_bucket):
         restore.S3Storage(conf)
 
 
+def test_extract_zip_archive_only_layouts():
+    with tempfile.TemporaryDirectory() as tempdir:
+        tempdir_path = Path(tempdir)
+        archive = tempdir_path / "gooddata_layouts.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("gooddata_layouts/ldm/ldm.yaml", "")
+            zf.writestr("unrelated/file.txt", "")
+
+        restore.RestoreWorker._extract_zip_archive(archive, tempdir_path)
+
+        assert (tempdir_path / "gooddata_layouts" / "ldm" / "ldm.yaml").exists()
+        assert not (tempdir_path / "unrelated").exists()
+
+
 @mock.patch("scripts.restore.zipfile.ZipFile")
 def test_restore_empty_ws(zipfile):
-    def create_empty_ws(tempdir):
+    def create_empty_ws(tempdir, members=None):
         os.mkdir(tempdir / "gooddata_layouts")
         os.mkdir(tempdir / "gooddata_layouts" / "ldm")
         os.mkdir(tempdir / "gooddata_layouts" / "analytics_model")
@@ -243,9 +434,32 @@ def test_restore_empty_ws(zipfile):
     )
 
 
+@mock.patch("scripts.restore.zipfile.ZipFile")
+def test_restore_multiple_ws_concurrently(zipfile):
+    def create_empty_ws(tempdir, members=None):
+        os.mkdir(tempdir / "gooddata_layouts")
+        os.mkdir(tempdir / "gooddata_layouts" / "ldm")
+        os.mkdir(tempdir / "gooddata_layouts" / "analytics_model")
+        os.mkdir(tempdir / "gooddata_layouts" / "user_data_filters")
+
+    zipfile.return_value.__enter__.return_value.extractall = create_empty_ws
+    sdk = mock.Mock()
+    api = mock.Mock()
+    storage = mock.Mock()
+    ws_paths = {f"ws_id_{i}": "some/ws/path" for i in range(8)}
+
+    worker = restore.RestoreWorker(sdk, api, storage, ws_paths, max_workers=4)
+    worker.incremental_restore()
+
+    sdk.catalog_workspace_content.put_declarative_ldm.assert_has_calls(
+        [mock.call(ws_id, mock.ANY) for ws_id in ws_paths], any_order=True
+    )
+    assert sdk.catalog_workspace_content.put_declarative_ldm.call_count == 8
+
+
 @mock.patch("scripts.restore.zipfile.ZipFile")
 def test_invalid_ws_on_disk_skipped(zipfile):
-    def create_invalid_ws(tempdir):
+    def create_invalid_ws(tempdir, members=None):
         # Missing AM directory
         os.mkdir(tempdir / "gooddata_layouts")
         os.mkdir(tempdir / "gooddata_layouts" / "ldm")
@@ -398,6 +612,68 @@ def test_incremental_restore_one_succeeds_one_fails(
     )
 
 
+@mock.patch("scripts.restore.RestoreWorker._load_user_data_filters")
+@mock.patch("scripts.restore.zipfile")
+def test_incremental_restore_prefetch_error(
+    _, _load_user_data_filters, create_backups_in_bucket
+):
+    ldm, ws_catalog = prepare_catalog_mocks()
+    ws_catalog.load_ldm_from_disk.return_value = ldm
+    sdk = mock.Mock()
+    sdk.catalog_workspace_content = ws_catalog
+    api = mock.Mock()
+
+    create_backups_in_bucket(["ws_id_1", "ws_id_2"])
+
+    conf = restore.BackupRestoreConfig(TEST_CONF_PATH)
+    storage = restore.S3Storage(conf)
+
+    ws_paths = {"ws_id_1": "ws_id_1", "ws_id_2": "ws_id_2"}
+
+    worker = restore.RestoreWorker(sdk, api, storage, ws_paths)
+    with (
+        forbid_archive_of("ws_id_1"),
+        mock.patch("scripts.restore.RestoreWorker._check_workspace_is_valid"),
+    ):
+        worker.incremental_restore()
+
+    ws_catalog.put_declarative_ldm.assert_called_once_with("ws_id_2", ldm)
+    assert_not_called_with(ws_catalog.put_declarative_ldm, "ws_id_1", mock.ANY)
+
+
+def test_incremental_restore_bounds_fetched_backups():
+    sdk = mock.Mock()
+    storage = mock.Mock()
+    ws_paths = {f"ws_id_{i}": f"ws_id_{i}" for i in range(8)}
+    worker = restore.RestoreWorker(sdk, mock.Mock(), storage, ws_paths, 2)
+
+    lock = threading.Lock()
+    on_disk = {"now": 0, "peak": 0}
+    applied: list[str] = []
+
+    def download(ws_id, temp_root):
+        with lock:
+            on_disk["now"] += 1
+            on_disk["peak"] = max(on_disk["peak"], on_disk["now"])
+        return Path(temp_root, ws_id, restore.LAYOUTS_DIR)
+
+    def apply(ws_id, src_path):
+        time.sleep(0.01)
+        with lock:
+            on_disk["now"] -= 1
+            applied.append(ws_id)
+        return True
+
+    with (
+        mock.patch.object(worker, "_download_workspace", side_effect=download),
+        mock.patch.object(worker, "_apply_workspace", side_effect=apply),
+    ):
+        worker.incremental_restore()
+
+    assert sorted(applied) == sorted(ws_paths)
+    assert on_disk["peak"] <= 4
+
+
 def test_load_user_data_filters():
     sdk = mock.Mock()
     api = mock.Mock()
@@ -441,7 +717,9 @@ def test_load_user_data_filters():
 def test_e2e(_, _load_user_data_filters, create_client, create_backups_in_bucket):
     conf_path = TEST_CONF_PATH
     csv_path = TEST_CSV_PATH
-    args = argparse.Namespace(conf=conf_path, ws_csv=csv_path, verbose=False)
+    args = argparse.Namespace(
+        conf=conf_path, ws_csv=csv_path, verbose=False, max_workers=1
+    )
 
     # Prepare sdk-related mocks
     ldm, ws_catalog = prepare_catalog_mocks()
@@ -11,6 +11,7 @@
 # THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import argparse
+import os
 import pytest
 from unittest import mock
 from dataclasses import dataclass
@@ -117,6 +118,7 @@ def test_user_group_mgmt_e2e(create_client):
         delimiter=",",
         ug_delimiter="|",
         quotechar='"',
+        concurrency=None,
         verbose=False,
     )
 
@@ -134,3 +136,106 @@ def test_user_group_mgmt_e2e(create_client):
     sdk.catalog_user.delete_user_group.assert_has_calls(
         expected_delete_calls, any_order=True
     )
+
+
+def test_parent_user_groups_created_first():
+    sdk = prepare_sdk()
+    target_user_groups = [
+        user_group_mgmt.TargetUserGroup("ug_6", "Child", ["ug_5"], True),
+        user_group_mgmt.TargetUserGroup("ug_5", "Parent", ["ug_1"], True),
+    ]
+
+    manager = user_group_mgmt.UserGroupManager(sdk, target_user_groups)
+    manager.manage_user_groups()
+
+    sdk.catalog_user.create_or_update_user_group.assert_has_calls(
+        [
+            mock.call(CatalogUserGroup.init("ug_5", "Parent", ["ug_1"])),
+            mock.call(CatalogUserGroup.init("ug_6", "Child", ["ug_5"])),
+        ]
+    )
+
+
+def test_duplicate_rows_of_new_group_created_once():
+    sdk = prepare_sdk()
+    target_user_groups = [
+        user_group_mgmt.TargetUserGroup("ug_5", "First", ["ug_1"], True),
+        user_group_mgmt.TargetUserGroup("ug_5", "Second", ["ug_1"], True),
+    ]
+
+    manager = user_group_mgmt.UserGroupManager(sdk, target_user_groups)
+    manager.manage_user_groups()
+
+    sdk.catalog_user.create_or_update_user_group.assert_called_once_with(
+        CatalogUserGroup.init("ug_5", "Second", ["ug_1"])
+    )
+
+
+def test_unsorted_parents_not_changed():
+    sdk = mock.Mock()
+    sdk.catalog_user.list_user_groups.return_value = [
+        MockUserGroup("ug_3", "Testers", ["ug_2", "ug_1"]).to_sdk(),
+    ]
+    row = ["ug_3", "Testers", "ug_2|ug_1", "True"]
+    target_user_groups = [user_group_mgmt.TargetUserGroup.from_csv_row(row, "|")]
+
+    manager = user_group_mgmt.UserGroupManager(sdk, target_user_groups)
+    manager.manage_user_groups()
+
+    sdk.catalog_user.create_or_update_user_group.assert_not_called()
+
+
+def test_create_or_update_error_detail_logged(caplog):
+    sdk = prepare_sdk()
+    error = Exception("Bad Request")
+    error.body = '{"detail": "Parent group not found", "status": 400}'
+    sdk.catalog_user.create_or_update_user_group.side_effect = error
+
+    manager = user_group_mgmt.UserGroupManager(sdk, [])
+    manager._create_or_update_user_group("ug_5", "Parent", [], "create")
+
+    assert "Parent group not found" in caplog.text
+
+
+@mock.patch("scripts.user_group_mgmt.time.sleep")
+def test_throttled_request_retried(sleep):
+    sdk = prepare_sdk()
+    error = Exception("Too Many Requests")
+    error.status = 429
+    sdk.catalog_user.delete_user_group.side_effect = [error, None]
+
+    manager = user_group_mgmt.UserGroupManager(sdk, [])
+    manager._delete_user_group({"ug_4"})
+
+    assert sdk.catalog_user.delete_user_group.call_count == 2
+    sleep.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "concurrency, env, expected",
+    [(4, "8", 4), (None, "8", 8), (None, None, 16)],
+)
+def test_get_concurrency(concurrency, env, expected):
+    environ = {} if env is None else {"GDC_MAX_WORKERS": env}
+    args = argparse.Namespace(concurrency=concurrency)
+    with mock.patch.dict(os.environ, environ, clear=True):
+        assert user_group_mgmt.get_concurrency(args) == expected
+
+
+@pytest.mark.parametrize("env", ["0", "-2", "many"])
+def test_get_concurrency_invalid_env_raises_error(env):
+    args = argparse.Namespace(concurrency=None)
+    with mock.patch.dict(os.environ, {"GDC_MAX_WORKERS": env}):
+        with pytest.raises(RuntimeError, match="GDC_MAX_WORKERS"):
+            user_group_mgmt.get_concurrency(args)
+
+
+def test_non_positive_concurrency_raises_error():
+    with pytest.raises(RuntimeError):
+        user_group_mgmt.UserGroupManager(prepare_sdk(), [], 0)
+
+
+def test_non_positive_concurrency_argument_rejected():
+    parser = user_group_mgmt.create_parser()
+    with pytest.raises(SystemExit):
+        parser.parse_args([TEST_CSV_PATH, "-c", "0"])
@@ -1,12 +1,13 @@
 # (C) 2023 GoodData Corporation
 import argparse
+import threading
+import time
 from dataclasses import dataclass
 from unittest import mock
 from typing import Any, Optional
 
 import pytest
 import gooddata_sdk as gd_sdk
-from gooddata_api_client.exceptions import NotFoundException
 
 from scripts import user_mgmt
 
@@ -69,6 +70,15 @@ def test_conflicting_delimiters_raises_error(path_exists):
         user_mgmt.validate_args(args)
 
 
+@pytest.mark.parametrize(
+    "is_active", ["true", "True", "TRUE", "tRuE", "false", "False", "yes", "1", ""]
+)
+def test_from_csv_row_is_active_matches_legacy_parsing(is_active):
+    row = ["some.user@gooddata.com", "", "", "", "", "", is_active]
+    user = user_mgmt.GDUserTarget.from_csv_row(row)
+    assert user.is_active == (is_active.lower() == "true")
+
+
 def test_user_obj_from_sdk():
     user_input = MockUser("some.user", "some", "user", "some@email.com", "auth", ["ug"])
     excepted = user_mgmt.GDUserTarget(
@@ -135,24 +145,17 @@ UPSTREAM_USERS = {
 
 UPSTREAM_UG_ID = "ug_1"
 EXPECTED_NEW_UG_OBJ = gd_sdk.CatalogUserGroup.init("ug_2", "ug_2")
-EXPECTED_GET_IDS = {"jozef.mrkva", "kristian.kalerab", "peter.pertzlen", "zoltan.zeler"}
 EXPECTED_CREATE_OR_UPDATE_IDS = {"peter.pertzlen", "zoltan.zeler", "kristian.kalerab"}
 
 
 def prepare_sdk():
-    def mock_get_user(user_id):
-        if user_id not in UPSTREAM_USERS:
-            raise NotFoundException
-        return UPSTREAM_USERS[user_id].to_sdk()
-
-    def mock_get_user_group(ug_id):
-        if ug_id != UPSTREAM_UG_ID:
-            raise NotFoundException
-        return
-
     sdk = mock.Mock()
-    sdk.catalog_user.get_user.side_effect = mock_get_user
-    sdk.catalog_user.get_user_group.side_effect = mock_get_user_group
+    sdk.catalog_user.list_users.return_value = [
+        user.to_sdk() for user in UPSTREAM_USERS.values()
+    ]
+    sdk.catalog_user.list_user_groups.return_value = [
+        gd_sdk.CatalogUserGroup.init(UPSTREAM_UG_ID, UPSTREAM_UG_ID)
+    ]
     return sdk
 
 
@@ -178,14 +181,13 @@ def test_user_mgmt_e2e(create_client):
         ug_delimiter="|",
         quotechar='"',
         verbose=False,
+        concurrency=4,
     )
 
     user_mgmt.user_mgmt(args)
 
-    sdk.catalog_user.get_user.assert_has_calls(
-        [mock.call(id) for id in EXPECTED_GET_IDS],
-        any_order=True,
-    )
+    sdk.catalog_user.list_users.assert_called_once()
+    sdk.catalog_user.get_user.assert_not_called()
 
     created_or_updated = {
         call[0][0].id for call in sdk.catalog_user.create_or_update_user.call_args_list
@@ -193,11 +195,66 @@ def test_user_mgmt_e2e(create_client):
     assert created_or_updated == EXPECTED_CREATE_OR_UPDATE_IDS
 
     sdk.catalog_user.delete_user.assert_has_calls(
-        [mock.call("richard.cvikla"), mock.call("adam.avokado")]
-    )
-    sdk.catalog_user.get_user_group.assert_has_calls(
-        [mock.call("ug_1"), mock.call("ug_2")]
+        [mock.call("richard.cvikla"), mock.call("adam.avokado")], any_order=True
     )
+    sdk.catalog_user.list_user_groups.assert_called_once()
+    sdk.catalog_user.get_user_group.assert_not_called()
     sdk.catalog_user.create_or_update_user_group.assert_called_once_with(
         EXPECTED_NEW_UG_OBJ
     )
+
+
+def test_manage_users_keeps_order_of_same_user_rows():
+    sdk = prepare_sdk()
+    user = user_mgmt.GDUserTarget("new.user", None, None, None, None, [], True)
+    deleted_user = user_mgmt.GDUserTarget("new.user", None, None, None, None, [], False)
+
+    user_manager = user_mgmt.UserManager(sdk, concurrency=4)
+    user_manager.manage_users([user, deleted_user])
+
+    sdk.catalog_user.create_or_update_user.assert_called_once()
+    sdk.catalog_user.delete_user.assert_called_once_with("new.user")
+
+
+def test_manage_users_bounds_rows_read_ahead():
+    sdk = prepare_sdk()
+    lock = threading.Lock()
+    counts = {"read": 0, "managed": 0, "lead": 0}
+
+    def read_users():
+        for i in range(200):
+            with lock:
+                counts["read"] += 1
+            yield user_mgmt.GDUserTarget(f"user_{i}", None, None, None, None, [], True)
+
+    def manage_user(user):
+        time.sleep(0.001)
+        with lock:
+            counts["managed"] += 1
+            counts["lead"] = max(counts["lead"], counts["read"] - counts["managed"])
+
+    user_manager = user_mgmt.UserManager(sdk, concurrency=2)
+    with mock.patch.object(user_manager, "manage_user", side_effect=manage_user):
+        user_manager.manage_users(read_users())
+
+    assert counts["managed"] == 200
+    assert counts["lead"] <= 2 * 2 + 1
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_non_positive_concurrency_raises_error(concurrency):
+    with pytest.raises(ValueError):
+        user_mgmt.UserManager(prepare_sdk(), concurrency)
+
+
+def test_non_positive_concurrency_argument_rejected():
+    parser = user_mgmt.create_parser()
+    with pytest.raises(SystemExit):
+        parser.parse_args([TEST_CSV_PATH, "-c", "0"])
+
+
+def test_csv_row_is_valid():
+    assert user_mgmt.csv_row_is_valid(["user", "", "", "", "", "", "True"])
+    assert not user_mgmt.csv_row_is_valid(["user", "", "True"])
+    assert not user_mgmt.csv_row_is_valid(["", "", "", "", "", "", "True"])
+    assert not user_mgmt.csv_row_is_valid(["user", "", "", "", "", "", ""])